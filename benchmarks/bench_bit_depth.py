@@ -0,0 +1,44 @@
+import bench_utils
+import numpy as np
+
+import enhancement_ops as ops
+
+OPERATIONS = {
+    'contrast_stretching': ops.contrast_stretch,
+    'histogram_equalization': ops.equalize_histogram,
+    'gaussian_smoothing': lambda img: ops.smooth(img, 'gaussian', 5),
+    'mean_smoothing': lambda img: ops.smooth(img, 'mean', 5),
+    'unsharp_sharpening': lambda img: ops.sharpen(img, 'unsharp'),
+    'laplacian_sharpening': lambda img: ops.sharpen(img, 'laplacian'),
+    'lowpass_gaussian': lambda img: ops.frequency_filter(img, 'lowpass', 'gaussian'),
+    'highpass_gaussian': lambda img: ops.frequency_filter(img, 'highpass', 'gaussian'),
+}
+
+
+def benchmark_bit_depth(shape=(2160, 3840), repeat=3):
+    """Compare the 8-bit, 16-bit and float32 paths for every pipeline operation"""
+    images = {dtype.__name__: bench_utils.synthetic_image(shape, dtype)
+              for dtype in (np.uint8, np.uint16, np.float32)}
+
+    print(f"{'operation':<24}{'uint8 ms':>10}{'uint16 ms':>11}{'float32 ms':>12}{'16/8':>7}")
+    totals = dict.fromkeys(images, 0.0)
+    worst = (None, 0.0)
+    for name, operation in OPERATIONS.items():
+        times = {key: bench_utils.time_call(lambda: operation(img), repeat)
+                 for key, img in images.items()}
+        for key in totals:
+            totals[key] += times[key]
+        ratio = times['uint16'] / times['uint8']
+        worst = max(worst, (name, ratio), key=lambda item: item[1])
+        print(f"{name:<24}{times['uint8']:>10.1f}{times['uint16']:>11.1f}"
+              f"{times['float32']:>12.1f}{ratio:>7.2f}")
+    print(f"{'total':<24}{totals['uint8']:>10.1f}{totals['uint16']:>11.1f}"
+          f"{totals['float32']:>12.1f}{totals['uint16'] / totals['uint8']:>7.2f}")
+    # The FFT filters dominate the total, so judge the 16-bit path per operation
+    print(f"worst 16/8 ratio: {worst[1]:.2f} ({worst[0]})")
+
+
+if __name__ == "__main__":
+    for shape in ((1080, 1920), (2160, 3840)):
+        print(f"\n{shape[1]}x{shape[0]}")
+        benchmark_bit_depth(shape)
@@ -0,0 +1,47 @@
+import numpy as np
+
+from bench_utils import synthetic_image, time_call
+
+import enhancement_ops as ops
+
+SIZES = {'1080p': (1080, 1920), '8K': (4320, 7680)}
+
+
+def _float_stretch(image):
+    """Previous implementation: full-frame float32 arithmetic from min/max"""
+    r_min, r_max = np.float32(image.min()), np.float32(image.max())
+    return ops.saturate_cast((image.astype(np.float32) - r_min) * (255.0 / (r_max - r_min)),
+                             image.dtype)
+
+
+def _rank_error(image, low, high, bounds):
+    """Largest distance, in percentage points, between requested and achieved ranks"""
+    cdf = np.bincount(image.ravel(), minlength=256).cumsum() / image.size * 100.0
+    return max(abs(cdf[int(bounds[0][0])] - low), abs(cdf[int(bounds[1][0])] - high))
+
+
+def benchmark_contrast_stretch(low=1.0, high=99.0, max_error=0.5):
+    """min/max float stretch vs LUT stretch with exact and sampled percentiles"""
+    print(f"{'image':<8}{'float ms':>10}{'lut ms':>9}{'exact pct ms':>14}{'sampled ms':>12}"
+          f"{'step':>6}{'rank err':>10}{'exact err':>11}")
+    for name, shape in SIZES.items():
+        image = synthetic_image(shape)
+        # A few hot and dead pixels that defeat a min/max stretch
+        image[::997, ::991] = 255
+        image[1::997, 1::991] = 0
+        float_ms = time_call(lambda: _float_stretch(image), repeat=3)
+        lut_ms = time_call(lambda: ops.contrast_stretch(image), repeat=3)
+        exact_ms = time_call(lambda: ops.contrast_stretch(image, low=low, high=high), repeat=3)
+        sampled_ms = time_call(
+            lambda: ops.contrast_stretch(image, low=low, high=high, max_error=max_error), repeat=3)
+        step = ops.sample_step(shape[0] * shape[1], max_error)
+        sampled = _rank_error(image, low, high, ops.percentile_bounds(image, low, high, max_error))
+        exact = _rank_error(image, low, high, ops.percentile_bounds(image, low, high))
+        print(f"{name:<8}{float_ms:>10.1f}{lut_ms:>9.1f}{exact_ms:>14.1f}{sampled_ms:>12.1f}"
+              f"{step:>6}{sampled:>10.3f}{exact:>11.3f}")
+    print(f"(sampled bound: rank error <= {max_error} points with 99% confidence; the exact "
+          "error is the histogram bin granularity)")
+
+
+if __name__ == "__main__":
+    benchmark_contrast_stretch()
@@ -0,0 +1,44 @@
+import tracemalloc
+
+from bench_utils import synthetic_image, time_call
+
+import enhancement_ops as ops
+import filter_bank
+
+CUTOFFS = tuple(range(10, 250, 10))
+
+
+def _peak_mb(func):
+    """Peak traced allocation of func() in MB"""
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 2 ** 20
+
+
+def benchmark_filter_bank(shape=(1080, 1920)):
+    """One frequency_filter call per setting vs one sweep, with and without images"""
+    image = synthetic_image(shape)
+    specs = filter_bank.filter_specs(cutoffs=CUTOFFS)
+
+    def one_by_one():
+        return [ops.frequency_filter(image, s['filter_type'], s['filter_name'], s['cutoff'],
+                                     s['order'] or 2) for s in specs]
+
+    variants = {
+        'frequency_filter per setting': one_by_one,
+        'sweep, images': lambda: filter_bank.sweep(image, cutoffs=CUTOFFS),
+        'sweep, energy + PSNR': lambda: filter_bank.sweep(
+            image, cutoffs=CUTOFFS, metrics=('energy_retained', 'psnr')),
+        'sweep, energy only': lambda: filter_bank.sweep(
+            image, cutoffs=CUTOFFS, metrics=('energy_retained',)),
+    }
+    print(f"{len(specs)} filters on a {shape[1]}x{shape[0]} image")
+    print(f"{'variant':<32}{'ms':>10}{'peak MB':>10}")
+    for name, func in variants.items():
+        print(f"{name:<32}{time_call(func, repeat=1):>10.0f}{_peak_mb(func):>10.0f}")
+
+
+if __name__ == "__main__":
+    benchmark_filter_bank()
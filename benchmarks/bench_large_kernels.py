@@ -0,0 +1,26 @@
+import bench_utils
+import cv2
+
+import large_kernel_filters as lkf
+
+KERNEL_SIZES = (5, 15, 31, 51, 101)
+
+
+def benchmark_large_kernels(shape=(2160, 3840), repeat=2):
+    """Time cv2.blur / cv2.medianBlur against the constant-time backends per kernel size"""
+    image = bench_utils.synthetic_image(shape)
+
+    print(f"{'kernel':>6}{'cv2.blur':>11}{'integral':>11}{'medianBlur':>12}{'histogram':>11}  (ms)")
+    for k in KERNEL_SIZES:
+        blur = bench_utils.time_call(lambda: cv2.blur(image, (k, k)), repeat)
+        integral = bench_utils.time_call(lambda: lkf.box_filter_integral(image, k), repeat)
+        median = bench_utils.time_call(lambda: cv2.medianBlur(image, k), repeat)
+        histogram = bench_utils.time_call(lambda: lkf.median_filter_histogram(image, k), 1)
+        print(f"{k:>6}{blur:>11.1f}{integral:>11.1f}{median:>12.1f}{histogram:>11.1f}")
+
+    thresholds = lkf.calibrate()
+    print(f"calibrated thresholds: mean={thresholds['mean']}, median={thresholds['median']}")
+
+
+if __name__ == "__main__":
+    benchmark_large_kernels()
@@ -0,0 +1,61 @@
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from bench_utils import synthetic_image, time_call
+
+import enhancement_ops as ops
+from image_pyramid import ImagePyramid
+
+# Half of the GUI's 10x8 inch figure at 100 dpi
+DISPLAY_SIZE = (800, 500)
+SPECTRUM_PREVIEW_SIZE = 512
+HISTOGRAM_SAMPLES = 1 << 18
+
+
+def _render(image):
+    """Draw an image the way update_display does, on an off-screen canvas"""
+    fig = Figure(figsize=(10, 8))
+    fig.add_subplot(121).imshow(ops.to_display(image), cmap='gray')
+    FigureCanvasAgg(fig).draw()
+
+
+def _spectrum(image):
+    return np.log(np.abs(np.fft.fftshift(np.fft.fft2(ops.to_grayscale(image)))) + 1)
+
+
+def _histogram(image):
+    return np.histogram(image, bins=256, range=(0, 256))[0]
+
+
+def benchmark_pyramid(shape=(4320, 7680, 3)):
+    """Full-resolution analysis views vs the coarsest sufficient pyramid level"""
+    image = synthetic_image(shape)
+    tasks = {
+        'display': (lambda: _render(image),
+                    lambda pyramid: _render(pyramid.fit(*DISPLAY_SIZE))),
+        'fft spectrum': (lambda: _spectrum(image),
+                         lambda pyramid: _spectrum(
+                             pyramid.coarsest(SPECTRUM_PREVIEW_SIZE, SPECTRUM_PREVIEW_SIZE))),
+        'histogram': (lambda: _histogram(image),
+                      lambda pyramid: _histogram(pyramid.sample(HISTOGRAM_SAMPLES))),
+    }
+
+    full_hist = _histogram(image) / image.size
+    estimate = _histogram(ImagePyramid(image).sample(HISTOGRAM_SAMPLES))
+    error = np.abs(estimate / estimate.sum() - full_hist).sum() / 2
+
+    print(f"image {shape}")
+    print(f"{'view':<14}{'full ms':>10}{'cold ms':>10}{'warm ms':>10}")
+    for name, (full, preview) in tasks.items():
+        full_ms = time_call(full, repeat=3)
+        # Cold builds the pyramid levels, warm reuses them like repeated redraws
+        cold_ms = time_call(lambda: preview(ImagePyramid(image)), repeat=3)
+        pyramid = ImagePyramid(image)
+        warm_ms = time_call(lambda: preview(pyramid), repeat=3)
+        print(f"{name:<14}{full_ms:>10.1f}{cold_ms:>10.1f}{warm_ms:>10.1f}")
+    print(f"histogram estimate total variation distance: {error:.4f}")
+
+
+if __name__ == "__main__":
+    benchmark_pyramid()
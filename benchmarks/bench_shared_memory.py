@@ -0,0 +1,35 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from bench_utils import synthetic_image, time_call
+
+from shm_workers import SharedMemoryWorkerPool
+
+SIZES = {'4K': (2160, 3840, 3), '8K': (4320, 7680, 3)}
+
+
+def _echo(image):
+    """Worker for the pickling baseline: the frame travels both ways"""
+    return image.copy()
+
+
+def benchmark_transport(processes=2, repeat=5):
+    """Round-trip cost of moving a frame to a worker and back, without processing"""
+    print(f"{'frame':<6}{'MB':>6}{'pickle ms':>12}{'shm ms':>10}{'shm+copies ms':>15}")
+    with ProcessPoolExecutor(processes) as executor, \
+            SharedMemoryWorkerPool(processes) as pool:
+        for name, shape in SIZES.items():
+            image = synthetic_image(shape)
+            pickled = time_call(lambda: executor.submit(_echo, image).result(), repeat)
+
+            # Frame already lives in shared memory (e.g. decoded into pool.frame())
+            frame = pool.share(image)
+            shared = time_call(lambda: pool.submit(frame, None).result().release(), repeat)
+            frame.release()
+
+            # Copy in and out of shared memory around each call
+            copies = time_call(lambda: pool.process(image, None), repeat)
+            print(f"{name:<6}{image.nbytes / 2**20:>6.0f}{pickled:>12.1f}{shared:>10.1f}{copies:>15.1f}")
+
+
+if __name__ == "__main__":
+    benchmark_transport()
@@ -0,0 +1,27 @@
+import bench_utils
+import cv2
+import numpy as np
+
+import sharpening
+
+
+def two_pass_unsharp(image):
+    """The previous implementation: full blurred image, then addWeighted"""
+    gaussian_blur = cv2.GaussianBlur(image, (9, 9), 10.0)
+    return cv2.addWeighted(image, 1.5, gaussian_blur, -0.5, 0)
+
+
+def benchmark_sharpening(repeat=5):
+    """Compare the two-pass unsharp mask with the fused strip implementation"""
+    print(f"{'frame':<10}{'channels':>9}{'two-pass ms':>13}{'fused ms':>10}{'identical':>11}")
+    for label, shape in (('1080p', (1080, 1920)), ('4K', (2160, 3840)), ('8K', (4320, 7680))):
+        for channels in (1, 3):
+            image = bench_utils.synthetic_image(shape if channels == 1 else shape + (3,))
+            baseline = bench_utils.time_call(lambda: two_pass_unsharp(image), repeat)
+            fused = bench_utils.time_call(lambda: sharpening.unsharp_mask(image), repeat)
+            same = np.array_equal(two_pass_unsharp(image), sharpening.unsharp_mask(image))
+            print(f"{label:<10}{channels:>9}{baseline:>13.1f}{fused:>10.1f}{str(same):>11}")
+
+
+if __name__ == "__main__":
+    benchmark_sharpening()
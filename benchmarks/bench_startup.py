@@ -0,0 +1,48 @@
+import os
+import subprocess
+import sys
+import time
+
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORTS = {
+    'image_enhancement (core)': 'import image_enhancement',
+    'core + matplotlib.pyplot (previous test/5.py)':
+        'import matplotlib.pyplot; import image_enhancement',
+    'image_enhancement_gui': 'import image_enhancement_gui',
+}
+
+CHECK_HEAVY_MODULES = (
+    "import sys, image_enhancement; "
+    "heavy = [m for m in ('matplotlib', 'tkinter') if m in sys.modules]; "
+    "print(', '.join(heavy) or 'none')"
+)
+
+
+def time_import(statement, repeat=5):
+    """Best-of-N wall time in ms of a fresh interpreter running an import statement"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', statement], cwd=PROJECT_DIR, check=True)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000.0
+
+
+def benchmark_startup():
+    """Cold interpreter start-up cost of importing the processing core"""
+    baseline = time_import('pass')
+    print(f"{'import':<48}{'ms':>8}{'over python':>13}")
+    print(f"{'(bare interpreter)':<48}{baseline:>8.0f}{0:>13.0f}")
+    for name, statement in IMPORTS.items():
+        elapsed = time_import(statement)
+        print(f"{name:<48}{elapsed:>8.0f}{elapsed - baseline:>13.0f}")
+
+    heavy = subprocess.run([sys.executable, '-c', CHECK_HEAVY_MODULES], cwd=PROJECT_DIR,
+                           check=True, capture_output=True, text=True).stdout.strip()
+    print(f"GUI modules loaded by the core: {heavy}")
+
+
+if __name__ == "__main__":
+    benchmark_startup()
@@ -0,0 +1,59 @@
+import os
+import tempfile
+import time
+import tracemalloc
+
+import bench_utils
+import cv2
+
+import enhancement_ops as ops
+import tile_executor
+
+
+def measure(func):
+    """(seconds, peak traced MB) for one call"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 2 ** 20
+
+
+def benchmark_tile_executor(shape=(8192, 8192), dtype='uint16'):
+    """Whole-frame processing versus the streaming strip executor on a large TIFF"""
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, 'input.tiff')
+        output_path = os.path.join(tmp, 'output.tiff')
+        image = bench_utils.synthetic_image(shape, dtype)
+        cv2.imwrite(input_path, image, [cv2.IMWRITE_TIFF_COMPRESSION, 1])
+        del image
+        print(f"input: {shape[1]}x{shape[0]} {dtype}, "
+              f"{os.path.getsize(input_path) / 2 ** 20:.0f} MB uncompressed TIFF")
+
+        def whole_frame(operation):
+            image = ops.read_image(input_path, high_bit_depth=True)
+            cv2.imwrite(output_path, operation(image))
+
+        cases = {
+            'gaussian 15': (lambda img: ops.smooth(img, 'gaussian', 15),
+                            lambda: tile_executor.process_file(
+                                input_path, output_path,
+                                *tile_executor.spatial_operation('gaussian', kernel_size=15))),
+            'unsharp': (lambda img: ops.sharpen(img, 'unsharp'),
+                        lambda: tile_executor.process_file(
+                            input_path, output_path, *tile_executor.spatial_operation('unsharp'))),
+            'equalization': (ops.equalize_histogram,
+                             lambda: tile_executor.equalize_file(input_path, output_path)),
+        }
+
+        print(f"{'operation':<14}{'whole s':>9}{'whole MB':>10}{'strips s':>10}{'strips MB':>11}")
+        for name, (operation, streaming) in cases.items():
+            whole_s, whole_mb = measure(lambda: whole_frame(operation))
+            strip_s, strip_mb = measure(streaming)
+            print(f"{name:<14}{whole_s:>9.2f}{whole_mb:>10.0f}{strip_s:>10.2f}{strip_mb:>11.0f}")
+
+
+if __name__ == "__main__":
+    benchmark_tile_executor()
@@ -0,0 +1,33 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+# Make the project modules importable when running `python benchmarks/<script>.py`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def time_call(func, repeat=5):
+    """Best-of-N wall time of func() in milliseconds (after one warm-up call)"""
+    func()
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000.0
+
+
+def synthetic_image(shape, dtype=np.uint8, seed=0):
+    """Smooth gradient plus noise, scaled to the full range of dtype"""
+    rng = np.random.default_rng(seed)
+    rows, cols = shape[:2]
+    y, x = np.mgrid[:rows, :cols]
+    base = (x / cols + y / rows) / 2.0
+    if len(shape) == 3:
+        base = np.repeat(base[..., np.newaxis], shape[2], axis=2)
+    image = np.clip(base * 0.8 + 0.1 + rng.normal(0, 0.05, base.shape), 0, 1)
+    if np.issubdtype(dtype, np.integer):
+        return (image * np.iinfo(dtype).max).astype(dtype)
+    return image.astype(dtype)
@@ -0,0 +1,232 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+
+def _bins(dtype):
+    """Histogram size for an integer plane"""
+    if dtype not in (np.uint8, np.uint16):
+        raise ValueError(f"CLAHE needs 8-bit or 16-bit planes, got {dtype}")
+    return np.iinfo(dtype).max + 1
+
+
+def pad_to_grid(plane, tile_grid):
+    """Reflect-pad a plane so it splits into whole tiles; returns (padded, tile_size)
+
+    tile_grid is (tiles_x, tiles_y) like cv2.createCLAHE's tileGridSize, and
+    tile_size is (rows, cols) of one tile.
+    """
+    tiles_x, tiles_y = tile_grid
+    rows, cols = plane.shape
+    if rows % tiles_y or cols % tiles_x:
+        # Same extents as cv2's CLAHE, which pads both axes whenever either is uneven
+        plane = cv2.copyMakeBorder(plane, 0, tiles_y - rows % tiles_y, 0, tiles_x - cols % tiles_x,
+                                   cv2.BORDER_REFLECT_101)
+    return plane, (plane.shape[0] // tiles_y, plane.shape[1] // tiles_x)
+
+
+def clip_histograms(hist, clip_limit, tile_pixels):
+    """Clip tile histograms and spread the excess over all bins, as cv2's CLAHE does
+
+    hist is (..., bins); the redistribution is vectorized over all tiles.
+    """
+    if clip_limit <= 0:
+        return hist
+    bins = hist.shape[-1]
+    limit = max(int(clip_limit * tile_pixels / bins), 1)
+    excess = np.maximum(hist - limit, 0).sum(axis=-1, keepdims=True)
+    clipped = np.minimum(hist, limit)
+    batch, residual = np.divmod(excess, bins)
+    # The remainder goes one count each to every step-th bin from bin 0
+    step = np.maximum(bins // np.maximum(residual, 1), 1)
+    index = np.arange(bins)
+    extra = (index % step == 0) & (index // step < residual)
+    return clipped + batch + extra
+
+
+def tile_luts(padded, tile_grid, tile_size, clip_limit, changed=None, luts=None,
+              max_workers=None):
+    """(tiles_y, tiles_x, bins) equalization LUT of every tile, in the plane's dtype
+
+    Tile histograms are computed in parallel, one tile row per task. With a
+    (tiles_y, tiles_x) boolean `changed` mask only those tiles are recomputed
+    and the rest are taken from `luts`.
+    """
+    tiles_x, tiles_y = tile_grid
+    tile_rows, tile_cols = tile_size
+    bins = _bins(padded.dtype)
+    if changed is None:
+        changed = np.ones((tiles_y, tiles_x), dtype=bool)
+    if luts is None:
+        luts = np.zeros((tiles_y, tiles_x, bins), dtype=padded.dtype)
+
+    def row_histograms(ty):
+        band = padded[ty * tile_rows:(ty + 1) * tile_rows]
+        return [cv2.calcHist([band[:, tx * tile_cols:(tx + 1) * tile_cols]], [0], None,
+                             [bins], [0, bins]).ravel()
+                for tx in np.flatnonzero(changed[ty])]
+
+    rows = [ty for ty in range(tiles_y) if changed[ty].any()]
+    if not rows:
+        return luts
+    with ThreadPoolExecutor(max_workers) as executor:
+        hist = np.array([h for row in executor.map(row_histograms, rows) for h in row],
+                        dtype=np.int64)
+
+    tile_pixels = tile_rows * tile_cols
+    cdf = clip_histograms(hist, clip_limit, tile_pixels).cumsum(axis=-1)
+    lut_scale = np.float32((bins - 1) / tile_pixels)
+    luts[changed] = np.clip(np.rint(cdf.astype(np.float32) * lut_scale), 0, bins - 1)
+    return luts
+
+
+def _axis_weights(size, tile, tiles):
+    """Neighbouring tile indices, second-tile weight and runs of equal pairs along one axis"""
+    position = np.arange(size, dtype=np.float32) * np.float32(1.0 / tile) - np.float32(0.5)
+    first = np.floor(position).astype(np.intp)
+    weight = position - first
+    first, second = np.maximum(first, 0), np.minimum(first + 1, tiles - 1)
+    starts = np.r_[0, np.flatnonzero(np.diff(first) | np.diff(second)) + 1]
+    return first, second, weight, starts
+
+
+def _lookup(values, lut):
+    if lut.dtype == np.uint8:
+        return cv2.LUT(values, lut)
+    return lut[values]
+
+
+def interpolate(plane, luts, tile_size, max_workers=None, dirty=None, output=None):
+    """Map a plane through the tile LUTs, bilinearly blending the four nearest tiles
+
+    The plane is cut into blocks that share the same four neighbouring tiles
+    (see block_grid). Each block is four whole-block LUT lookups and a
+    vectorized weighted sum; bands of blocks run in parallel. With a boolean
+    `dirty` block mask only those blocks are recomputed into `output`.
+    """
+    tiles_y, tiles_x, _ = luts.shape
+    rows, cols = plane.shape
+    row1, row2, ya, row_starts = _axis_weights(rows, tile_size[0], tiles_y)
+    col1, col2, xa, col_starts = _axis_weights(cols, tile_size[1], tiles_x)
+    row_bounds = list(zip(row_starts, np.r_[row_starts[1:], rows]))
+    col_bounds = list(zip(col_starts, np.r_[col_starts[1:], cols]))
+    if output is None:
+        output = np.empty_like(plane)
+
+    def band(index):
+        top, bottom = row_bounds[index]
+        upper_luts, lower_luts = luts[row1[top]], luts[row2[top]]
+        y_weight = ya[top:bottom, np.newaxis]
+        for j, (left, right) in enumerate(col_bounds):
+            if dirty is not None and not dirty[index, j]:
+                continue
+            block = plane[top:bottom, left:right]
+            x_weight = xa[left:right]
+            t1, t2 = col1[left], col2[left]
+            upper = _lookup(block, upper_luts[t1]).astype(np.float32)
+            upper += (_lookup(block, upper_luts[t2]) - upper) * x_weight
+            lower = _lookup(block, lower_luts[t1]).astype(np.float32)
+            lower += (_lookup(block, lower_luts[t2]) - lower) * x_weight
+            lower -= upper
+            lower *= y_weight
+            upper += lower
+            output[top:bottom, left:right] = np.rint(upper, out=upper)
+
+    with ThreadPoolExecutor(max_workers) as executor:
+        list(executor.map(band, range(len(row_bounds))))
+    return output
+
+
+def block_grid(shape, tile_size, tile_grid):
+    """Interpolation blocks of a plane: start rows/cols and neighbouring tile indices
+
+    Returns ((row_starts, tile_row1, tile_row2), (col_starts, tile_col1, tile_col2)),
+    with one entry per block row / column.
+    """
+    tiles_x, tiles_y = tile_grid
+    row1, row2, _, row_starts = _axis_weights(shape[0], tile_size[0], tiles_y)
+    col1, col2, _, col_starts = _axis_weights(shape[1], tile_size[1], tiles_x)
+    return ((row_starts, row1[row_starts], row2[row_starts]),
+            (col_starts, col1[col_starts], col2[col_starts]))
+
+
+def clahe(plane, clip_limit=2.0, tile_grid=(8, 8), max_workers=None):
+    """Contrast limited adaptive histogram equalization of an 8-bit or 16-bit plane
+
+    clip_limit: histogram clip relative to a uniform histogram, as in
+    cv2.createCLAHE (0 disables clipping)
+    tile_grid: (tiles_x, tiles_y)
+    """
+    tile_grid = tuple(tile_grid)
+    padded, tile_size = pad_to_grid(plane, tile_grid)
+    luts = tile_luts(padded, tile_grid, tile_size, clip_limit, max_workers=max_workers)
+    return interpolate(plane, luts, tile_size, max_workers)
+
+
+class VideoCLAHE:
+    """CLAHE for frame sequences that reuses work on unchanged tiles
+
+    A tile or block is unchanged when no pixel differs from the previous frame
+    by more than `tolerance`. Only changed tiles get a new histogram and LUT,
+    and only blocks whose pixels or neighbouring LUTs changed are
+    re-interpolated; the rest keep the previous output. Multi-channel frames
+    are handled per channel.
+    """
+
+    def __init__(self, clip_limit=2.0, tile_grid=(8, 8), tolerance=0, max_workers=None):
+        self.clip_limit = clip_limit
+        self.tile_grid = tuple(tile_grid)
+        self.tolerance = tolerance
+        self.max_workers = max_workers
+        self.reused_tiles = 0
+        self.reused_blocks = 0
+        self._previous = {}
+
+    def _plane(self, channel, plane):
+        padded, tile_size = pad_to_grid(plane, self.tile_grid)
+        tiles_x, tiles_y = self.tile_grid
+        previous = self._previous.get(channel)
+        if previous is None or previous['padded'].shape != padded.shape \
+                or previous['padded'].dtype != padded.dtype:
+            luts = tile_luts(padded, self.tile_grid, tile_size, self.clip_limit,
+                             max_workers=self.max_workers)
+            output = interpolate(plane, luts, tile_size, self.max_workers)
+        else:
+            diff = cv2.absdiff(padded, previous['padded'])
+            tile_diff = diff.reshape(tiles_y, tile_size[0], tiles_x, tile_size[1]).max(axis=(1, 3))
+            changed = tile_diff > self.tolerance
+            luts = tile_luts(padded, self.tile_grid, tile_size, self.clip_limit, changed,
+                             previous['luts'].copy(), self.max_workers)
+            self.reused_tiles += int(changed.size - changed.sum())
+
+            # A block needs new output if its pixels or any of its four LUTs changed
+            lut_changed = (luts != previous['luts']).any(axis=-1)
+            (row_starts, row1, row2), (col_starts, col1, col2) = block_grid(
+                plane.shape, tile_size, self.tile_grid)
+            block_diff = np.maximum.reduceat(
+                np.maximum.reduceat(diff[:plane.shape[0], :plane.shape[1]], row_starts, axis=0),
+                col_starts, axis=1)
+            dirty = block_diff > self.tolerance
+            for tile_rows in (row1, row2):
+                for tile_cols in (col1, col2):
+                    dirty |= lut_changed[np.ix_(tile_rows, tile_cols)]
+            self.reused_blocks += int(dirty.size - dirty.sum())
+            output = interpolate(plane, luts, tile_size, self.max_workers, dirty,
+                                 previous['output'].copy())
+
+        # Keep copies: decoders often reuse their frame buffers
+        self._previous[channel] = {'padded': padded.copy() if padded is plane else padded,
+                                   'luts': luts, 'output': output.copy()}
+        return output
+
+    def apply(self, frame):
+        """Equalized frame; reused_tiles / reused_blocks count the work skipped"""
+        self.reused_tiles = self.reused_blocks = 0
+        if frame.ndim == 2:
+            return self._plane(0, frame)
+        return np.dstack([self._plane(c, frame[..., c]) for c in range(frame.shape[2])])
+
+    def reset(self):
+        """Forget the previous frame, e.g. after a scene cut"""
+        self._previous = {}
@@ -0,0 +1,394 @@
+import math
+
+import cv2
+import numpy as np
+
+import large_kernel_filters
+import sharpening
+
+# Color handling:
+#   'grayscale'   - load as a single channel (the original behaviour)
+#   'luminance'   - convert to YCrCb, process only the Y plane, merge back
+#   'per_channel' - process all BGR channels together in one vectorized call
+COLOR_MODES = ('grayscale', 'luminance', 'per_channel')
+
+# Largest median kernel cv2.medianBlur accepts for 16-bit and float images
+MAX_HIGH_DEPTH_MEDIAN = 5
+
+# cv2 depths that saturate_cast can convert to in one pass
+CV_DEPTHS = {np.dtype(np.uint8): cv2.CV_8U, np.dtype(np.uint16): cv2.CV_16U,
+             np.dtype(np.int16): cv2.CV_16S}
+
+# Sample types cv2 can write to each file format; other formats are 8-bit only
+FORMAT_DTYPES = {
+    '.png': (np.uint8, np.uint16),
+    '.tif': (np.uint8, np.uint16, np.float32),
+    '.tiff': (np.uint8, np.uint16, np.float32),
+}
+
+
+def read_image(image_path, color_mode='grayscale', high_bit_depth=False):
+    """Read an image as grayscale or 3-channel BGR depending on the color mode"""
+    if color_mode not in COLOR_MODES:
+        raise ValueError(f"Unknown color mode: {color_mode}")
+    flags = cv2.IMREAD_GRAYSCALE if color_mode == 'grayscale' else cv2.IMREAD_COLOR
+    if high_bit_depth:
+        # Keep 16-bit / float samples instead of reducing them to 8 bits
+        flags |= cv2.IMREAD_ANYDEPTH
+    image = cv2.imread(image_path, flags)
+    return None if image is None else normalize_float(image)
+
+
+def normalize_float(image, bounds=None):
+    """Scale float images with samples outside [0, 1] into it; other images pass through
+
+    Float TIFFs often hold raw values such as [0, 4000], while the operations
+    treat float images as [0, 1]. bounds is the (min, max) of the whole image
+    when normalizing one strip of it.
+    """
+    if not np.issubdtype(image.dtype, np.floating):
+        return image
+    if bounds is None:
+        bounds = image.min(), image.max()
+    low, high = float(bounds[0]), float(bounds[1])
+    if low >= 0.0 and high <= 1.0:
+        return image
+    low, high = min(low, 0.0), max(high, 1.0)
+    return ((image - low) / (high - low)).astype(image.dtype)
+
+
+def value_range(dtype):
+    """(min, max) output range for an image dtype; float images use [0, 1] (see normalize_float)"""
+    if np.issubdtype(dtype, np.integer):
+        info = np.iinfo(dtype)
+        return info.min, info.max
+    return 0.0, 1.0
+
+
+def saturate_cast(values, dtype):
+    """Round and clip float intermediates into dtype instead of wrapping"""
+    if not np.issubdtype(dtype, np.integer):
+        return values.astype(dtype, copy=False)
+    depth = CV_DEPTHS.get(np.dtype(dtype))
+    if (depth is not None and values.dtype in (np.float32, np.float64)
+            and values.ndim in (2, 3) and (values.ndim == 2 or values.shape[2] <= 4)):
+        # cv2 rounds half to even and saturates in a single pass
+        return cv2.add(values, 0.0, dtype=depth)
+    low, high = value_range(dtype)
+    values = np.clip(values, low, high)
+    np.rint(values, out=values)
+    return values.astype(dtype)
+
+
+def is_color(image):
+    """Return True for multi-channel images"""
+    return image.ndim == 3 and image.shape[2] > 1
+
+
+def apply_color_mode(image, operation, color_mode='per_channel'):
+    """Run a channel-aware operation on an image according to the color mode"""
+    if not is_color(image) or color_mode != 'luminance':
+        return operation(image)
+
+    # Luminance only: roughly the cost of one grayscale pass
+    y, cr, cb = cv2.split(cv2.cvtColor(image, cv2.COLOR_BGR2YCrCb))
+    y = operation(y)
+    return cv2.cvtColor(cv2.merge([y, cr, cb]), cv2.COLOR_YCrCb2BGR)
+
+
+def operation_input(image, color_mode='per_channel'):
+    """The planes an operation sees under apply_color_mode (the Y plane for luminance)"""
+    if is_color(image) and color_mode == 'luminance':
+        return cv2.cvtColor(image, cv2.COLOR_BGR2YCrCb)[..., 0]
+    return image
+
+
+def to_display(image):
+    """Convert BGR images to RGB for matplotlib, pass grayscale through"""
+    if not is_color(image):
+        return image
+    if image.dtype != np.uint8:
+        # matplotlib only accepts 8-bit or [0, 1] float RGB data
+        image = image.astype(np.float32) / value_range(image.dtype)[1]
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+
+def for_format(image, ext):
+    """Image converted to a sample type the file format can store
+
+    cv2.imwrite / imencode silently truncate other types (a float image in
+    [0, 1] becomes 0s and 1s in a PNG), so unsupported images are rescaled to
+    the deepest integer type the format supports, saturating out-of-range values.
+    """
+    supported = FORMAT_DTYPES.get(ext.lower(), (np.uint8,))
+    if image.dtype in supported:
+        return image
+    target = np.dtype([dtype for dtype in supported if np.issubdtype(dtype, np.integer)][-1])
+    scale = value_range(target)[1] / value_range(image.dtype)[1]
+    return saturate_cast(image.astype(np.float32) * np.float32(scale), target)
+
+
+def to_grayscale(image):
+    """Single-channel view of an image for analysis tools"""
+    if is_color(image):
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return image
+
+
+def contrast_stretch(image, r_min=None, r_max=None, low=0.0, high=100.0, max_error=None):
+    """Contrast stretching per channel, to the full range of the dtype
+
+    r_min / r_max default to the per-channel values at the low / high
+    percentiles: the extremes for 0 and 100, while e.g. 1 and 99 ignore hot or
+    dead pixels. max_error samples the statistics instead of scanning every
+    pixel (see percentile_bounds). Pass r_min / r_max in to stretch a strip of
+    a larger image with global statistics. Channels with r_max <= r_min are
+    left unchanged, and 8-bit images are mapped through a single LUT.
+    """
+    if r_min is None or r_max is None:
+        if low == 0.0 and high == 100.0 and max_error is None:
+            bounds = image.min(axis=(0, 1)), image.max(axis=(0, 1))
+        else:
+            bounds = percentile_bounds(image, low, high, max_error)
+        r_min = bounds[0] if r_min is None else r_min
+        r_max = bounds[1] if r_max is None else r_max
+    r_min = np.asarray(r_min, dtype=np.float32)
+    r_max = np.asarray(r_max, dtype=np.float32)
+    out_max = value_range(image.dtype)[1]
+
+    # Uniform channels have no range to stretch, map them to themselves
+    span = r_max - r_min
+    gain = np.where(span > 0, out_max / np.where(span > 0, span, 1), 1).astype(np.float32)
+    offset = np.where(span > 0, r_min, 0).astype(np.float32)
+
+    channels = 1 if image.ndim == 2 else image.shape[2]
+    if image.dtype == np.uint8:
+        levels = np.arange(256, dtype=np.float32)
+        lut = (levels - offset.reshape(-1, 1)) * gain.reshape(-1, 1)
+        return apply_lut(image, saturate_cast(np.broadcast_to(lut, (channels, 256)), np.uint8))
+    if image.dtype == np.uint16 and channels <= 4:
+        # One saturating pass: cv2.transform with a diagonal gain matrix
+        matrix = np.zeros((channels, channels + 1))
+        matrix[np.arange(channels), np.arange(channels)] = np.broadcast_to(gain, channels)
+        matrix[:, channels] = -np.broadcast_to(offset * gain, channels)
+        planes = image.reshape(image.shape[0], image.shape[1], channels)
+        return cv2.transform(planes, matrix).reshape(image.shape)
+    stretched = (image.astype(np.float32) - offset) * gain
+    if np.issubdtype(image.dtype, np.floating):
+        # Percentile bounds push outliers past the range; saturate floats too
+        np.clip(stretched, 0.0, out_max, out=stretched)
+    return saturate_cast(stretched, image.dtype)
+
+
+def sample_step(pixels, max_error, confidence=0.99):
+    """Largest sampling stride that keeps percentile ranks within max_error points
+
+    By the Dvoretzky-Kiefer-Wolfowitz inequality, n samples put every
+    percentile rank within sqrt(ln(2 / (1 - confidence)) / (2 n)) of the exact
+    one with the given confidence.
+    """
+    epsilon = max_error / 100.0
+    samples = math.log(2.0 / (1.0 - confidence)) / (2.0 * epsilon ** 2)
+    return max(int(math.sqrt(pixels / samples)), 1)
+
+
+def histogram_percentiles(hist, low, high, dtype):
+    """Per-channel values at the low / high percentiles of a (channels, bins) histogram"""
+    cdf = hist.cumsum(axis=1)
+    total = cdf[:, -1:]
+    bounds = [np.argmax(cdf >= np.maximum(q / 100.0 * total, 1), axis=1) for q in (low, high)]
+    if np.issubdtype(dtype, np.floating):
+        # Float histograms are binned at 16-bit resolution
+        bounds = [b / 65535.0 for b in bounds]
+    return bounds[0], bounds[1]
+
+
+def percentile_bounds(image, low=1.0, high=99.0, max_error=None, confidence=0.99):
+    """Per-channel (r_low, r_high) values at the low / high percentiles, from a histogram
+
+    max_error=None counts every pixel. Otherwise the histogram is built from a
+    strided sample (every step-th row and column) just large enough to keep the
+    percentile ranks within max_error percentage points (see sample_step). This
+    assumes the image content is not periodic with the stride.
+    """
+    if max_error is not None:
+        step = sample_step(image.shape[0] * image.shape[1], max_error, confidence)
+        if step > 1:
+            image = np.ascontiguousarray(image[::step, ::step])
+    return histogram_percentiles(channel_histograms(image), low, high, image.dtype)
+
+
+def _histogram_codes(image):
+    """Integer bin index per sample and the number of bins for an image dtype"""
+    if image.dtype in (np.uint8, np.uint16):
+        return image, np.iinfo(image.dtype).max + 1
+    if np.issubdtype(image.dtype, np.floating):
+        # Float data is binned at 16-bit resolution over [0, 1]
+        if image.min() < 0.0 or image.max() > 1.0:
+            raise ValueError("Float images must lie in [0, 1]; scale them with normalize_float")
+        return saturate_cast(image * 65535.0, np.uint16), 65536
+    raise ValueError(f"Unsupported image dtype: {image.dtype}")
+
+
+def channel_histograms(image):
+    """(channels, bins) histogram; 256 bins for 8-bit, 65536 for 16-bit and float"""
+    codes, bins = _histogram_codes(image)
+    channels = 1 if image.ndim == 2 else image.shape[2]
+    # cv2.calcHist bins 8-bit and 16-bit samples natively
+    return np.stack([cv2.calcHist([codes], [c], None, [bins], [0, bins]).ravel()
+                     for c in range(channels)]).astype(np.float64)
+
+
+def apply_lut(image, lut):
+    """Map every sample through a (channels, bins) lookup table"""
+    if image.dtype == np.uint8:
+        channels = lut.shape[0]
+        return cv2.LUT(image, np.ascontiguousarray(lut.T).reshape(256, 1, channels))
+    codes, _ = _histogram_codes(image)
+    # np.take from a contiguous LUT row is about twice as fast as fancy indexing
+    if image.ndim == 2:
+        return np.take(lut[0], codes)
+    return cv2.merge([np.take(lut[c], plane) for c, plane in enumerate(cv2.split(codes))])
+
+
+def equalization_lut(hist, out_max):
+    """Equalization mapping for a (channels, bins) histogram, as cv2.equalizeHist computes it"""
+    bins = hist.shape[1]
+    cdf = hist.cumsum(axis=1)
+    total = cdf[:, -1:]
+    cdf_min = np.where(hist > 0, cdf, total).min(axis=1, keepdims=True)
+    denom = np.maximum(total - cdf_min, 1)
+    lut = (cdf - cdf_min) * (out_max / denom)
+    # Single-valued channels are left unchanged, as cv2.equalizeHist does
+    identity = np.arange(bins) * (out_max / (bins - 1))
+    return np.where(total == cdf_min, identity, lut)
+
+
+def equalize_histogram(image, hist=None):
+    """Histogram equalization for 8-bit, 16-bit and float images via histogram + LUT
+
+    hist defaults to the image's own histogram; pass a global one to equalize a
+    strip of a larger image.
+    """
+    if hist is None:
+        if image.dtype == np.uint8 and image.ndim == 2:
+            return cv2.equalizeHist(image)
+        hist = channel_histograms(image)
+    lut = saturate_cast(equalization_lut(hist, value_range(image.dtype)[1]), image.dtype)
+    return apply_lut(image, lut)
+
+
+def adaptive_equalize(image, clip_limit=2.0, tile_grid=(8, 8)):
+    """Contrast limited adaptive histogram equalization (CLAHE) per channel
+
+    tile_grid is (tiles_x, tiles_y); float images are equalized at 16-bit
+    resolution. Still images go through cv2.createCLAHE; clahe.VideoCLAHE
+    reuses tiles across frames.
+    """
+    if np.issubdtype(image.dtype, np.floating):
+        codes, _ = _histogram_codes(image)
+        return (adaptive_equalize(codes, clip_limit, tile_grid) / 65535.0).astype(image.dtype)
+    equalizer = cv2.createCLAHE(clip_limit, tuple(tile_grid))
+    if image.ndim == 2:
+        return equalizer.apply(image)
+    return cv2.merge([equalizer.apply(plane) for plane in cv2.split(image)])
+
+
+def smooth(image, filter_type='gaussian', kernel_size=5, backend='auto'):
+    """Spatial smoothing; cv2 filters handle all channels natively
+
+    backend: 'cv2', 'constant_time' (integral-image mean / histogram median) or
+    'auto', which picks the constant-time backend above the kernel size threshold
+    """
+    if backend == 'constant_time' or (
+            backend == 'auto' and large_kernel_filters.uses_constant_time(
+                filter_type, kernel_size, image.dtype)):
+        return large_kernel_filters.constant_time_smooth(image, filter_type, kernel_size)
+
+    if filter_type == 'mean':
+        return cv2.blur(image, (kernel_size, kernel_size))
+    elif filter_type == 'gaussian':
+        if image.dtype == np.uint16:
+            # OpenCV's 16-bit Gaussian is several times slower than its float32 one;
+            # blurring the float copy in place saves a third full-size buffer
+            blurred = image.astype(np.float32)
+            cv2.GaussianBlur(blurred, (kernel_size, kernel_size), 1.0, dst=blurred)
+            return saturate_cast(blurred, image.dtype)
+        return cv2.GaussianBlur(image, (kernel_size, kernel_size), 1.0)
+    elif filter_type == 'median':
+        if image.dtype != np.uint8 and kernel_size > MAX_HIGH_DEPTH_MEDIAN:
+            raise ValueError(f"Median kernel size {kernel_size} needs an 8-bit image; "
+                             f"{image.dtype} images allow at most {MAX_HIGH_DEPTH_MEDIAN}")
+        return cv2.medianBlur(image, kernel_size)
+    raise ValueError(f"Unknown smoothing filter: {filter_type}")
+
+
+def sharpen(image, method='unsharp', amount=0.5, radius=4, threshold=0):
+    """Spatial sharpening; amount/radius/threshold tune unsharp masking"""
+    if method == 'laplacian':
+        laplacian = cv2.Laplacian(image, cv2.CV_32F)
+        return saturate_cast(np.absolute(laplacian), image.dtype)
+    elif method == 'unsharp':
+        return sharpening.unsharp_mask(image, amount, radius, threshold=threshold)
+    elif method == 'custom':
+        return sharpening.kernel_sharpen(image)
+    raise ValueError(f"Unknown sharpening method: {method}")
+
+
+def frequency_distance(shape):
+    """Distance of every frequency from the centre of a shifted spectrum"""
+    rows, cols = shape
+    crow, ccol = rows // 2, cols // 2
+    y, x = np.ogrid[:rows, :cols]
+    return np.sqrt((x - ccol) ** 2 + (y - crow) ** 2)
+
+
+def frequency_mask(shape, filter_type='lowpass', filter_name='gaussian', cutoff=50, order=2,
+                   distance=None):
+    """Build a centred frequency domain filter mask
+
+    distance: a precomputed frequency_distance(shape) grid (possibly
+    ifftshifted), so many masks can share one
+    """
+    d = frequency_distance(shape) if distance is None else distance
+
+    if filter_name == 'ideal':
+        if filter_type == 'lowpass':
+            mask = (d <= cutoff).astype(float)
+        else:
+            mask = (d > cutoff).astype(float)
+    elif filter_name == 'gaussian':
+        if filter_type == 'lowpass':
+            mask = np.exp(-(d ** 2) / (2 * (cutoff ** 2)))
+        else:
+            mask = 1 - np.exp(-(d ** 2) / (2 * (cutoff ** 2)))
+    elif filter_name == 'butterworth':
+        if filter_type == 'lowpass':
+            mask = 1 / (1 + (d / cutoff) ** (2 * order))
+        else:
+            mask = 1 - 1 / (1 + (d / cutoff) ** (2 * order))
+    else:
+        raise ValueError(f"Unknown frequency filter: {filter_name}")
+    return mask
+
+
+def frequency_filter(image, filter_type='lowpass', filter_name='gaussian', cutoff=50, order=2):
+    """Frequency domain filtering; color images are transformed as stacked channels"""
+    axes = (0, 1)
+
+    # FFT over the spatial axes only, all channels at once, in single precision
+    f_transform = np.fft.fft2(image.astype(np.float32), axes=axes)
+    f_shift = np.fft.fftshift(f_transform, axes=axes)
+
+    mask = frequency_mask(image.shape[:2], filter_type, filter_name, cutoff, order)
+    mask = mask.astype(np.float32)
+    if image.ndim == 3:
+        mask = mask[..., np.newaxis]
+
+    # Apply filter
+    filtered = f_shift * mask
+
+    # IFFT
+    f_ishift = np.fft.ifftshift(filtered, axes=axes)
+    img_back = np.fft.ifft2(f_ishift, axes=axes)
+    return saturate_cast(np.real(img_back), image.dtype)
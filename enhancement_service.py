@@ -0,0 +1,202 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+import enhancement_ops as ops
+from image_enhancement import OPERATIONS, apply_operation
+
+
+class QueueFullError(RuntimeError):
+    """Raised when a request cannot be admitted before its admission timeout"""
+
+
+def decode_image(image_bytes, color_mode='grayscale', high_bit_depth=False):
+    """Decode encoded image bytes the way read_image loads a file"""
+    flags = cv2.IMREAD_GRAYSCALE if color_mode == 'grayscale' else cv2.IMREAD_COLOR
+    if high_bit_depth:
+        flags |= cv2.IMREAD_ANYDEPTH
+    image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), flags)
+    if image is None:
+        raise ValueError("Failed to decode image")
+    return ops.normalize_float(image)
+
+
+def process_request(image_bytes, operation, params, color_mode='grayscale',
+                    high_bit_depth=False, output_format='.png'):
+    """Decode, enhance and re-encode one request (runs on the executor)"""
+    image = decode_image(image_bytes, color_mode, high_bit_depth)
+    result = apply_operation(image, operation, params, color_mode)
+    ok, encoded = cv2.imencode(output_format, ops.for_format(result, output_format))
+    if not ok:
+        raise ValueError(f"Failed to encode result as {output_format}")
+    return encoded.tobytes()
+
+
+def request_key(image_bytes, operation, params, color_mode, high_bit_depth, output_format):
+    """Identity of a request; identical in-flight requests share one computation"""
+    digest = hashlib.blake2b(image_bytes, digest_size=16).hexdigest()
+    spec = json.dumps([digest, operation, params, color_mode, high_bit_depth, output_format],
+                      sort_keys=True, default=str)
+    return hashlib.blake2b(spec.encode(), digest_size=16).hexdigest()
+
+
+class EnhancementService:
+    """Asyncio front end that runs enhancement requests on a bounded executor
+
+    Identical requests that arrive while one is in flight are coalesced onto
+    the same computation. At most max_pending distinct requests are admitted
+    (queued or running); further requests wait for a slot, and give up with
+    QueueFullError after admission_timeout seconds (None waits indefinitely,
+    0 rejects immediately when full).
+    """
+
+    def __init__(self, executor=None, max_workers=None, max_pending=32,
+                 admission_timeout=None, latency_window=1024):
+        self.executor = executor or ThreadPoolExecutor(max_workers)
+        self._owns_executor = executor is None
+        self.max_pending = max_pending
+        self.admission_timeout = admission_timeout
+        self._pending = 0
+        self._slot_freed = None
+        self._in_flight = {}
+        self._latencies = deque(maxlen=latency_window)
+        self.stats = {'requests': 0, 'computed': 0, 'coalesced': 0, 'rejected': 0, 'failed': 0}
+
+    async def enhance(self, image_bytes, operation, params=None, color_mode='grayscale',
+                      high_bit_depth=False, output_format='.png'):
+        """Enhanced image bytes for an encoded image and an operation spec"""
+        if operation not in OPERATIONS:
+            raise ValueError(f"Unknown operation: {operation}")
+        if color_mode not in ops.COLOR_MODES:
+            raise ValueError(f"Unknown color mode: {color_mode}")
+        params = params or {}
+        start = time.perf_counter()
+        self.stats['requests'] += 1
+
+        key = request_key(image_bytes, operation, params, color_mode, high_bit_depth,
+                          output_format)
+        task = self._in_flight.get(key)
+        if task is None:
+            args = (image_bytes, operation, params, color_mode, high_bit_depth, output_format)
+            task = asyncio.ensure_future(self._run(key, args))
+            self._in_flight[key] = task
+        else:
+            self.stats['coalesced'] += 1
+
+        # Shield the shared computation from cancellation of any one caller
+        result = await asyncio.shield(task)
+        self._latencies.append(time.perf_counter() - start)
+        return result
+
+    async def handle(self, image_bytes, spec):
+        """Entry point for transports: spec holds operation, params, color_mode, ..."""
+        return await self.enhance(image_bytes, spec['operation'], spec.get('params'),
+                                  spec.get('color_mode', 'grayscale'),
+                                  spec.get('high_bit_depth', False),
+                                  spec.get('output_format', '.png'))
+
+    async def _admit(self):
+        """Wait for one of the max_pending slots"""
+        if self._slot_freed is None:
+            self._slot_freed = asyncio.Condition()
+        async with self._slot_freed:
+            if self._pending >= self.max_pending:
+                try:
+                    await asyncio.wait_for(
+                        self._slot_freed.wait_for(lambda: self._pending < self.max_pending),
+                        self.admission_timeout)
+                except asyncio.TimeoutError:
+                    self.stats['rejected'] += 1
+                    raise QueueFullError(
+                        f"{self._pending} requests pending (limit {self.max_pending})") from None
+            self._pending += 1
+
+    async def _release(self):
+        async with self._slot_freed:
+            self._pending -= 1
+            self._slot_freed.notify()
+
+    async def _run(self, key, args):
+        """Compute one distinct request on the executor"""
+        try:
+            await self._admit()
+            try:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(self.executor, process_request, *args)
+                self.stats['computed'] += 1
+                return result
+            except Exception:
+                self.stats['failed'] += 1
+                raise
+            finally:
+                await self._release()
+        finally:
+            self._in_flight.pop(key, None)
+
+    @property
+    def pending(self):
+        """Distinct requests currently admitted (queued or running)"""
+        return self._pending
+
+    def latency_percentiles(self, percentiles=(50, 90, 99)):
+        """Request latency percentiles in milliseconds over the recent window"""
+        if not self._latencies:
+            return {p: None for p in percentiles}
+        values = np.percentile(np.array(self._latencies) * 1000.0, percentiles)
+        return dict(zip(percentiles, values.tolist()))
+
+    def close(self):
+        """Shut down the executor if the service created it"""
+        if self._owns_executor:
+            self.executor.shutdown(wait=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        # Waiting for the executor would block the event loop; do it on a thread
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+
+class LocalClient:
+    """In-process stand-in for a network client: same calls, no sockets
+
+    The spec goes through a JSON round trip like it would on the wire, so
+    anything that would not survive serialization fails here as well.
+    """
+
+    def __init__(self, service):
+        self.service = service
+
+    async def enhance(self, image_bytes, operation, color_mode='grayscale',
+                      high_bit_depth=False, output_format='.png', **params):
+        """Enhanced image bytes for an encoded image"""
+        spec = json.dumps({'operation': operation, 'params': params, 'color_mode': color_mode,
+                           'high_bit_depth': high_bit_depth, 'output_format': output_format})
+        return await self.service.handle(bytes(image_bytes), json.loads(spec))
+
+
+async def _demo(image_path='profile.jpg', burst=16):
+    """Fire a burst of partly identical requests and report coalescing and latency"""
+    with open(image_path, 'rb') as f:
+        image_bytes = f.read()
+
+    async with EnhancementService(max_workers=4, max_pending=8) as service:
+        client = LocalClient(service)
+        requests = [client.enhance(image_bytes, 'spatial_smoothing',
+                                   filter_type='gaussian', kernel_size=3 + 2 * (i % 4))
+                    for i in range(burst)]
+        await asyncio.gather(*requests)
+        print(service.stats)
+        print(service.latency_percentiles())
+
+
+# Usage
+if __name__ == "__main__":
+    asyncio.run(_demo())
@@ -5,9 +5,16 @@ import matplotlib.pyplot as plt
 # Load grayscale image
 img = cv2.imread('profile.jpg', 0)
 
-# Contrast stretching
-r_min, r_max = np.min(img), np.max(img)
-stretched = ((img - r_min) / (r_max - r_min) * 255).astype(np.uint8)
+# Contrast stretching between the 1st and 99th percentiles of the histogram,
+# so a few hot or dead pixels do not set the range; a uniform image is left unchanged
+cdf = np.bincount(img.ravel(), minlength=256).cumsum()
+r_min, r_max = np.searchsorted(cdf, 0.01 * cdf[-1]), np.searchsorted(cdf, 0.99 * cdf[-1])
+levels = np.arange(256, dtype=np.float32)
+if r_max > r_min:
+    lut = np.clip(np.rint((levels - r_min) * (255.0 / (r_max - r_min))), 0, 255)
+else:
+    lut = levels
+stretched = cv2.LUT(img, lut.astype(np.uint8))
 
 # Display
 # plt.subplot(1,2,1); plt.title('Original'); plt.imshow(img, cmap='gray')
@@ -0,0 +1,180 @@
+import os
+
+import cv2
+
+import enhancement_ops as ops
+import filter_bank
+import large_kernel_filters
+from result_cache import ResultCache, image_digest
+
+# Operations by name, each taking the image plus keyword parameters; shared by
+# ImageEnhancement, the result cache keys and the async service
+OPERATIONS = {
+    'contrast_stretching': lambda img, low=0.0, high=100.0, max_error=None:
+        ops.contrast_stretch(img, low=low, high=high, max_error=max_error),
+    'histogram_equalization': lambda img: ops.equalize_histogram(img),
+    'adaptive_equalization': lambda img, clip_limit=2.0, tile_grid=(8, 8):
+        ops.adaptive_equalize(img, clip_limit, tile_grid),
+    'spatial_smoothing': lambda img, filter_type='gaussian', kernel_size=5, backend='auto':
+        ops.smooth(img, filter_type, kernel_size, backend),
+    'spatial_sharpening': lambda img, method='unsharp', amount=0.5, radius=4, threshold=0:
+        ops.sharpen(img, method, amount, radius, threshold),
+    'frequency_domain_filter': lambda img, filter_type='lowpass', filter_name='gaussian', cutoff=50:
+        ops.frequency_filter(img, filter_type, filter_name, cutoff),
+}
+
+def apply_operation(image, name, params=None, color_mode='grayscale'):
+    """Run a named operation with its parameters on an image honouring the color mode"""
+    if name not in OPERATIONS:
+        raise ValueError(f"Unknown operation: {name}")
+    operation = OPERATIONS[name]
+    return ops.apply_color_mode(image, lambda img: operation(img, **(params or {})), color_mode)
+
+class ImageEnhancement:
+    def __init__(self, image_path, color_mode='grayscale', high_bit_depth=False, cache_dir=None):
+        """color_mode: 'grayscale', 'luminance' (Y plane only) or 'per_channel'
+        high_bit_depth: keep 16-bit / float samples instead of reducing them to 8 bits
+        cache_dir: reuse results from an on-disk cache keyed by image content and parameters"""
+        self.color_mode = color_mode
+        self.original = ops.read_image(image_path, color_mode, high_bit_depth)
+        self.results = {}
+        self.cache = ResultCache(cache_dir) if cache_dir else None
+        self._image_hash = None
+    
+    def _apply(self, name, params):
+        """Run a named operation on the original image honouring the color mode and cache"""
+        def compute():
+            return apply_operation(self.original, name, params, self.color_mode)
+        
+        if self.cache is None:
+            return compute()
+        if self._image_hash is None:
+            self._image_hash = image_digest(self.original)
+        key = self.cache.key(self._image_hash, name, dict(params, color_mode=self.color_mode))
+        return self.cache.get_or_compute(key, compute)
+    
+    def contrast_stretching(self, low=0.0, high=100.0, max_error=None):
+        """Apply contrast stretching between the low and high percentiles
+        max_error: estimate the percentiles from a pixel sample, within this many percentage points"""
+        stretched = self._apply('contrast_stretching',
+                                {'low': low, 'high': high, 'max_error': max_error})
+        self.results['contrast_stretching'] = stretched
+        return stretched
+    
+    def histogram_equalization(self):
+        """Apply histogram equalization"""
+        equalized = self._apply('histogram_equalization', {})
+        self.results['histogram_equalization'] = equalized
+        return equalized
+    
+    def adaptive_equalization(self, clip_limit=2.0, tile_grid=(8, 8)):
+        """Apply contrast limited adaptive histogram equalization (CLAHE)"""
+        equalized = self._apply('adaptive_equalization',
+                                {'clip_limit': clip_limit, 'tile_grid': tuple(tile_grid)})
+        self.results['adaptive_equalization'] = equalized
+        return equalized
+    
+    def spatial_smoothing(self, filter_type='gaussian', kernel_size=5):
+        """Apply spatial smoothing filters"""
+        # The backend is part of the cache key: the constant-time mean can round
+        # 16-bit pixels differently from cv2.blur
+        backend = 'constant_time' if large_kernel_filters.uses_constant_time(
+            filter_type, kernel_size, self.original.dtype) else 'cv2'
+        result = self._apply('spatial_smoothing',
+                             {'filter_type': filter_type, 'kernel_size': kernel_size,
+                              'backend': backend})
+        
+        self.results[f'{filter_type}_smoothing'] = result
+        return result
+    
+    def spatial_sharpening(self, method='unsharp', amount=0.5, radius=4, threshold=0):
+        """Apply spatial sharpening"""
+        result = self._apply('spatial_sharpening',
+                             {'method': method, 'amount': amount, 'radius': radius,
+                              'threshold': threshold})
+        
+        self.results[f'{method}_sharpening'] = result
+        return result
+    
+    def frequency_domain_filter(self, filter_type='lowpass', filter_name='gaussian', cutoff=50):
+        """Apply frequency domain filtering"""
+        result = self._apply('frequency_domain_filter',
+                             {'filter_type': filter_type, 'filter_name': filter_name,
+                              'cutoff': cutoff})
+        
+        self.results[f'{filter_type}_{filter_name}'] = result
+        return result
+    
+    def frequency_filter_sweep(self, filter_names=filter_bank.FILTER_NAMES,
+                               filter_types=filter_bank.FILTER_TYPES, cutoffs=(50,), orders=(2,),
+                               metrics=None):
+        """Evaluate a bank of frequency filters in one pass (see filter_bank.sweep)
+        metrics: e.g. ('energy_retained', 'psnr') to return only summary numbers instead of images"""
+        plane = ops.operation_input(self.original, self.color_mode)
+        sweep = filter_bank.sweep(plane, filter_names, filter_types, cutoffs, orders, metrics)
+        if metrics is None:
+            for result in sweep:
+                # Merge luminance results back into color images
+                result['image'] = ops.apply_color_mode(self.original, lambda _: result['image'],
+                                                       self.color_mode)
+        return sweep
+    
+    def run_complete_pipeline(self):
+        """Run all enhancement techniques"""
+        print("Running complete image enhancement pipeline...")
+        
+        # Point processing
+        self.contrast_stretching()
+        self.histogram_equalization()
+        self.adaptive_equalization()
+        
+        # Spatial filtering
+        self.spatial_smoothing('gaussian')
+        self.spatial_smoothing('mean')
+        self.spatial_sharpening('unsharp')
+        self.spatial_sharpening('laplacian')
+        
+        # Frequency domain filtering
+        self.frequency_domain_filter('lowpass', 'gaussian')
+        self.frequency_domain_filter('highpass', 'gaussian')
+        
+        print("Pipeline complete!")
+        return self.results
+    
+    def display_all_results(self):
+        """Display all enhancement results"""
+        # Imported here so batch workers never pay for matplotlib
+        import matplotlib.pyplot as plt
+        
+        num_results = len(self.results) + 1  # +1 for original
+        cols = 4
+        rows = (num_results + cols - 1) // cols
+        
+        plt.figure(figsize=(15, rows * 4))
+        
+        # Display original
+        plt.subplot(rows, cols, 1)
+        plt.imshow(ops.to_display(self.original), cmap='gray')
+        plt.title('Original')
+        plt.axis('off')
+        
+        # Display results
+        for i, (name, img) in enumerate(self.results.items(), 2):
+            plt.subplot(rows, cols, i)
+            plt.imshow(ops.to_display(img), cmap='gray')
+            plt.title(name.replace('_', ' ').title())
+            plt.axis('off')
+        
+        plt.tight_layout()
+        plt.show()
+    
+    def save_results(self, output_dir='output'):
+        """Save all results"""
+        os.makedirs(output_dir, exist_ok=True)
+        
+        # JPEG is 8-bit only; keep 16-bit / float results lossless in TIFF
+        ext = 'jpg' if self.original.dtype == 'uint8' else 'tiff'
+        for name, img in self.results.items():
+            cv2.imwrite(f'{output_dir}/{name}.{ext}', img)
+        
+        print(f"All results saved to {output_dir} directory")
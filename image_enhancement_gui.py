@@ -2,10 +2,25 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import cv2
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
 import os
+import enhancement_ops as ops
+from image_pyramid import ImagePyramid
+
+# Analysis previews: spectrum of a level at least this many pixels across, and
+# histogram estimates from at least this many samples
+SPECTRUM_PREVIEW_SIZE = 512
+HISTOGRAM_SAMPLES = 1 << 18
+
+# Percentile rank error allowed by the sampled contrast stretch, in percentage points
+SAMPLED_STRETCH_ERROR = 0.5
+
+def create_figure_canvas(master, **figure_kwargs):
+    """Matplotlib figure embedded in a Tk widget; matplotlib is only imported on first use"""
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    from matplotlib.figure import Figure
+    
+    fig = Figure(**figure_kwargs)
+    return fig, FigureCanvasTkAgg(fig, master)
 
 class ImageEnhancementGUI:
     def __init__(self, root):
@@ -18,6 +33,7 @@ class ImageEnhancementGUI:
         self.original_image = None
         self.current_image = None
         self.image_path = None
+        self.pyramids = {}
         
         # Create main interface
         self.create_widgets()
@@ -57,6 +73,24 @@ class ImageEnhancementGUI:
         ttk.Button(file_frame, text="Save Image", command=self.save_image).grid(row=0, column=1, padx=5, pady=5)
         ttk.Button(file_frame, text="Reset", command=self.reset_image).grid(row=0, column=2, padx=5, pady=5)
         
+        # Color mode used when loading and processing
+        color_frame = ttk.Frame(file_frame)
+        color_frame.grid(row=1, column=0, columnspan=3, sticky=(tk.W, tk.E))
+        
+        ttk.Label(color_frame, text="Color:").grid(row=0, column=0, padx=5)
+        self.color_mode = tk.StringVar(value="grayscale")
+        ttk.Radiobutton(color_frame, text="Grayscale", variable=self.color_mode, 
+                       value="grayscale").grid(row=0, column=1, padx=2)
+        ttk.Radiobutton(color_frame, text="Luminance", variable=self.color_mode, 
+                       value="luminance").grid(row=0, column=2, padx=2)
+        ttk.Radiobutton(color_frame, text="Per Channel", variable=self.color_mode, 
+                       value="per_channel").grid(row=0, column=3, padx=2)
+        
+        # Keep 16-bit / float samples instead of reducing them to 8 bits
+        self.high_bit_depth = tk.BooleanVar(value=False)
+        ttk.Checkbutton(color_frame, text="High Bit Depth", 
+                       variable=self.high_bit_depth).grid(row=1, column=1, columnspan=3, sticky=tk.W, padx=2)
+        
         # Point Processing
         point_frame = ttk.LabelFrame(control_frame, text="Point Processing", padding="5")
         point_frame.grid(row=1, column=0, sticky=(tk.W, tk.E), pady=(0, 10))
@@ -65,6 +99,39 @@ class ImageEnhancementGUI:
                   command=self.apply_contrast_stretching).grid(row=0, column=0, padx=5, pady=5)
         ttk.Button(point_frame, text="Histogram Equalization", 
                   command=self.apply_histogram_equalization).grid(row=0, column=1, padx=5, pady=5)
+        ttk.Button(point_frame, text="Adaptive Equalization (CLAHE)", 
+                  command=self.apply_adaptive_equalization).grid(row=1, column=0, columnspan=2, pady=5)
+        
+        # Contrast stretching percentiles; outliers beyond them are saturated
+        stretch_frame = ttk.Frame(point_frame)
+        stretch_frame.grid(row=3, column=0, columnspan=2, sticky=(tk.W, tk.E))
+        
+        self.stretch_low = tk.DoubleVar(value=1.0)
+        self.stretch_high = tk.DoubleVar(value=99.0)
+        stretch_controls = [("Low %:", self.stretch_low, 0.0, 10.0),
+                            ("High %:", self.stretch_high, 90.0, 100.0)]
+        for column, (label, variable, low, high) in enumerate(stretch_controls):
+            ttk.Label(stretch_frame, text=label).grid(row=0, column=2 * column, padx=2)
+            ttk.Scale(stretch_frame, from_=low, to=high, orient=tk.HORIZONTAL, 
+                     variable=variable, length=100).grid(row=0, column=2 * column + 1, padx=2)
+        
+        # Estimate the percentiles from a pixel sample on large images
+        self.stretch_sampled = tk.BooleanVar(value=False)
+        ttk.Checkbutton(stretch_frame, text="Sampled Statistics", 
+                       variable=self.stretch_sampled).grid(row=1, column=0, columnspan=4, sticky=tk.W, padx=2)
+        
+        # CLAHE parameters: clip limit and tiles per side
+        clahe_frame = ttk.Frame(point_frame)
+        clahe_frame.grid(row=2, column=0, columnspan=2, sticky=(tk.W, tk.E))
+        
+        self.clahe_clip_limit = tk.DoubleVar(value=2.0)
+        self.clahe_tiles = tk.IntVar(value=8)
+        clahe_controls = [("Clip Limit:", self.clahe_clip_limit, 0.5, 10.0),
+                          ("Tiles:", self.clahe_tiles, 2, 32)]
+        for column, (label, variable, low, high) in enumerate(clahe_controls):
+            ttk.Label(clahe_frame, text=label).grid(row=0, column=2 * column, padx=2)
+            ttk.Scale(clahe_frame, from_=low, to=high, orient=tk.HORIZONTAL, 
+                     variable=variable, length=100).grid(row=0, column=2 * column + 1, padx=2)
         
         # Spatial Filtering
         spatial_frame = ttk.LabelFrame(control_frame, text="Spatial Filtering", padding="5")
@@ -88,7 +155,7 @@ class ImageEnhancementGUI:
         
         ttk.Label(kernel_frame, text="Kernel Size:").grid(row=0, column=0, padx=5)
         self.kernel_size = tk.IntVar(value=5)
-        kernel_scale = ttk.Scale(kernel_frame, from_=3, to=15, orient=tk.HORIZONTAL, 
+        kernel_scale = ttk.Scale(kernel_frame, from_=3, to=101, orient=tk.HORIZONTAL, 
                                 variable=self.kernel_size, length=200)
         kernel_scale.grid(row=0, column=1, padx=5)
         ttk.Label(kernel_frame, textvariable=self.kernel_size).grid(row=0, column=2, padx=5)
@@ -105,6 +172,21 @@ class ImageEnhancementGUI:
         ttk.Button(sharp_subframe, text="Custom Kernel", 
                   command=lambda: self.apply_sharpening('custom')).grid(row=0, column=3, padx=2)
         
+        # Unsharp masking parameters
+        unsharp_frame = ttk.Frame(spatial_frame)
+        unsharp_frame.grid(row=3, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=5)
+        
+        self.unsharp_amount = tk.DoubleVar(value=0.5)
+        self.unsharp_radius = tk.IntVar(value=4)
+        self.unsharp_threshold = tk.IntVar(value=0)
+        unsharp_controls = [("Amount:", self.unsharp_amount, 0.1, 3.0),
+                            ("Radius:", self.unsharp_radius, 1, 25),
+                            ("Threshold:", self.unsharp_threshold, 0, 50)]
+        for column, (label, variable, low, high) in enumerate(unsharp_controls):
+            ttk.Label(unsharp_frame, text=label).grid(row=0, column=2 * column, padx=2)
+            ttk.Scale(unsharp_frame, from_=low, to=high, orient=tk.HORIZONTAL, 
+                     variable=variable, length=70).grid(row=0, column=2 * column + 1, padx=2)
+        
         # Frequency Domain Filtering
         freq_frame = ttk.LabelFrame(control_frame, text="Frequency Domain Filtering", padding="5")
         freq_frame.grid(row=3, column=0, sticky=(tk.W, tk.E), pady=(0, 10))
@@ -156,14 +238,18 @@ class ImageEnhancementGUI:
         ttk.Button(analysis_frame, text="Show FFT Spectrum", 
                   command=self.show_fft_spectrum).grid(row=0, column=1, padx=5, pady=5)
         
+        # Display is drawn from a pyramid level matching the canvas size unless ticked
+        self.full_resolution = tk.BooleanVar(value=False)
+        ttk.Checkbutton(analysis_frame, text="Full Resolution Display", variable=self.full_resolution,
+                       command=self.update_display).grid(row=1, column=0, columnspan=2, sticky=tk.W, padx=5)
+        
     def create_image_panel(self, parent):
         # Image display frame
         image_frame = ttk.LabelFrame(parent, text="Image Display", padding="10")
         image_frame.grid(row=1, column=1, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S))
         
         # Create matplotlib figure
-        self.fig = Figure(figsize=(10, 8), facecolor='white')
-        self.canvas = FigureCanvasTkAgg(self.fig, image_frame)
+        self.fig, self.canvas = create_figure_canvas(image_frame, figsize=(10, 8), facecolor='white')
         self.canvas.get_tk_widget().grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
         # Configure grid weights for image frame
@@ -182,7 +268,8 @@ class ImageEnhancementGUI:
         
         if file_path:
             self.image_path = file_path
-            self.original_image = cv2.imread(file_path, cv2.IMREAD_GRAYSCALE)
+            self.original_image = ops.read_image(file_path, self.color_mode.get(),
+                                                 self.high_bit_depth.get())
             if self.original_image is not None:
                 self.current_image = self.original_image.copy()
                 self.update_display()
@@ -196,14 +283,20 @@ class ImageEnhancementGUI:
             messagebox.showwarning("Warning", "No image to save!")
             return
             
+        # JPEG is 8-bit only; offer lossless TIFF first for 16-bit / float images
+        jpeg, png, tiff = ("JPEG files", "*.jpg"), ("PNG files", "*.png"), \
+            ("TIFF files (16-bit/float)", "*.tiff")
+        high_depth = self.current_image.dtype != np.uint8
         file_path = filedialog.asksaveasfilename(
             title="Save Image",
-            defaultextension=".jpg",
-            filetypes=[("JPEG files", "*.jpg"), ("PNG files", "*.png"), ("All files", "*.*")]
+            defaultextension=".tiff" if high_depth else ".jpg",
+            filetypes=([tiff, png, jpeg] if high_depth else [jpeg, png, tiff]) + [("All files", "*.*")]
         )
         
         if file_path:
-            cv2.imwrite(file_path, self.current_image)
+            # Formats that cannot hold the samples get a saturating conversion
+            ext = os.path.splitext(file_path)[1]
+            cv2.imwrite(file_path, ops.for_format(self.current_image, ext))
             messagebox.showinfo("Success", "Image saved successfully!")
             
     def reset_image(self):
@@ -212,17 +305,31 @@ class ImageEnhancementGUI:
             self.current_image = self.original_image.copy()
             self.update_display()
             
+    def pyramid(self, name):
+        """Pyramid of original_image or current_image, rebuilt when the image changes"""
+        image = getattr(self, name)
+        pyramid = self.pyramids.get(name)
+        if pyramid is None or pyramid.image is not image:
+            pyramid = self.pyramids[name] = ImagePyramid(image)
+        return pyramid
+        
+    def apply_operation(self, operation):
+        """Apply an operation to the current image honouring the color mode"""
+        self.current_image = ops.apply_color_mode(self.current_image, operation,
+                                                  self.color_mode.get())
+        self.update_display()
+        
     def apply_contrast_stretching(self):
         """Apply contrast stretching"""
         if self.current_image is None:
             messagebox.showwarning("Warning", "Please load an image first!")
             return
             
-        r_min = np.min(self.current_image)
-        r_max = np.max(self.current_image)
-        stretched = ((self.current_image - r_min) * (255.0 / (r_max - r_min))).astype(np.uint8)
-        self.current_image = stretched
-        self.update_display()
+        low = round(float(self.stretch_low.get()), 1)
+        high = round(float(self.stretch_high.get()), 1)
+        max_error = SAMPLED_STRETCH_ERROR if self.stretch_sampled.get() else None
+        
+        self.apply_operation(lambda img: ops.contrast_stretch(img, low=low, high=high, max_error=max_error))
         
     def apply_histogram_equalization(self):
         """Apply histogram equalization"""
@@ -230,9 +337,18 @@ class ImageEnhancementGUI:
             messagebox.showwarning("Warning", "Please load an image first!")
             return
             
-        equalized = cv2.equalizeHist(self.current_image)
-        self.current_image = equalized
-        self.update_display()
+        self.apply_operation(ops.equalize_histogram)
+        
+    def apply_adaptive_equalization(self):
+        """Apply contrast limited adaptive histogram equalization"""
+        if self.current_image is None:
+            messagebox.showwarning("Warning", "Please load an image first!")
+            return
+            
+        clip_limit = round(float(self.clahe_clip_limit.get()), 1)
+        tiles = int(self.clahe_tiles.get())
+        
+        self.apply_operation(lambda img: ops.adaptive_equalize(img, clip_limit, (tiles, tiles)))
         
     def apply_spatial_filter(self, filter_type):
         """Apply spatial filtering"""
@@ -243,16 +359,14 @@ class ImageEnhancementGUI:
         kernel_size = int(self.kernel_size.get())
         if kernel_size % 2 == 0:  # Ensure odd kernel size
             kernel_size += 1
+        if (filter_type == 'median' and self.current_image.dtype != np.uint8
+                and kernel_size > ops.MAX_HIGH_DEPTH_MEDIAN):
+            # OpenCV's median filter is limited to small kernels above 8 bits
+            kernel_size = ops.MAX_HIGH_DEPTH_MEDIAN
+            messagebox.showinfo("Median Filter",
+                                f"Kernel size capped at {kernel_size} for high bit depth images")
             
-        if filter_type == 'mean':
-            result = cv2.blur(self.current_image, (kernel_size, kernel_size))
-        elif filter_type == 'gaussian':
-            result = cv2.GaussianBlur(self.current_image, (kernel_size, kernel_size), 1.0)
-        elif filter_type == 'median':
-            result = cv2.medianBlur(self.current_image, kernel_size)
-            
-        self.current_image = result
-        self.update_display()
+        self.apply_operation(lambda img: ops.smooth(img, filter_type, kernel_size))
         
     def apply_sharpening(self, method):
         """Apply sharpening filters"""
@@ -260,18 +374,11 @@ class ImageEnhancementGUI:
             messagebox.showwarning("Warning", "Please load an image first!")
             return
             
-        if method == 'laplacian':
-            laplacian = cv2.Laplacian(self.current_image, cv2.CV_64F)
-            result = np.absolute(laplacian).astype(np.uint8)
-        elif method == 'unsharp':
-            gaussian_blur = cv2.GaussianBlur(self.current_image, (9, 9), 10.0)
-            result = cv2.addWeighted(self.current_image, 1.5, gaussian_blur, -0.5, 0)
-        elif method == 'custom':
-            kernel = np.array([[-1, -1, -1], [-1, 9, -1], [-1, -1, -1]])
-            result = cv2.filter2D(self.current_image, -1, kernel)
-            
-        self.current_image = result
-        self.update_display()
+        amount = round(float(self.unsharp_amount.get()), 2)
+        radius = int(self.unsharp_radius.get())
+        threshold = int(self.unsharp_threshold.get())
+        
+        self.apply_operation(lambda img: ops.sharpen(img, method, amount, radius, threshold))
         
     def apply_frequency_filter(self):
         """Apply frequency domain filtering"""
@@ -279,48 +386,12 @@ class ImageEnhancementGUI:
             messagebox.showwarning("Warning", "Please load an image first!")
             return
             
-        rows, cols = self.current_image.shape
-        
-        # FFT
-        f_transform = np.fft.fft2(self.current_image)
-        f_shift = np.fft.fftshift(f_transform)
-        
-        # Create filter
-        crow, ccol = rows // 2, cols // 2
-        y, x = np.ogrid[:rows, :cols]
-        d = np.sqrt((x - ccol) ** 2 + (y - crow) ** 2)
-        
         cutoff = self.cutoff_freq.get()
         filter_type = self.filter_type.get()
         filter_design = self.filter_design.get()
         
-        if filter_design == 'ideal':
-            if filter_type == 'lowpass':
-                mask = (d <= cutoff).astype(float)
-            else:
-                mask = (d > cutoff).astype(float)
-        elif filter_design == 'gaussian':
-            if filter_type == 'lowpass':
-                mask = np.exp(-(d ** 2) / (2 * (cutoff ** 2)))
-            else:
-                mask = 1 - np.exp(-(d ** 2) / (2 * (cutoff ** 2)))
-        elif filter_design == 'butterworth':
-            order = 2
-            if filter_type == 'lowpass':
-                mask = 1 / (1 + (d / cutoff) ** (2 * order))
-            else:
-                mask = 1 - 1 / (1 + (d / cutoff) ** (2 * order))
-        
-        # Apply filter
-        filtered = f_shift * mask
-        
-        # IFFT
-        f_ishift = np.fft.ifftshift(filtered)
-        img_back = np.fft.ifft2(f_ishift)
-        result = np.real(img_back).astype(np.uint8)
-        
-        self.current_image = result
-        self.update_display()
+        self.apply_operation(
+            lambda img: ops.frequency_filter(img, filter_type, filter_design, cutoff))
         
     def show_histogram(self):
         """Show histogram in a new window"""
@@ -333,15 +404,38 @@ class ImageEnhancementGUI:
         hist_window.title("Histogram")
         hist_window.geometry("600x400")
         
-        fig = Figure(figsize=(8, 6))
-        ax = fig.add_subplot(111)
-        ax.hist(self.current_image.ravel(), bins=256, range=[0, 256], alpha=0.7)
-        ax.set_xlabel('Pixel Intensity')
-        ax.set_ylabel('Frequency')
-        ax.set_title('Image Histogram')
-        ax.grid(True, alpha=0.3)
+        fig, canvas = create_figure_canvas(hist_window, figsize=(8, 6))
+        image = self.current_image
+        if image.dtype == np.uint8:
+            hist_range = [0, 256]
+        else:
+            hist_range = [0, ops.value_range(image.dtype)[1]]
+        
+        def draw(data, title):
+            # Scale sampled counts up so estimates and full counts share an axis
+            weights = np.full(data.shape[0] * data.shape[1], image.size / data.size, np.float32)
+            fig.clear()
+            ax = fig.add_subplot(111)
+            if ops.is_color(data):
+                for channel, color in enumerate(('b', 'g', 'r')):
+                    ax.hist(data[..., channel].ravel(), bins=256, range=hist_range,
+                            weights=weights, alpha=0.4, color=color)
+            else:
+                ax.hist(data.ravel(), bins=256, range=hist_range, weights=weights, alpha=0.7)
+            ax.set_xlabel('Pixel Intensity')
+            ax.set_ylabel('Frequency')
+            ax.set_title(title)
+            ax.grid(True, alpha=0.3)
+            canvas.draw()
+        
+        sample = self.pyramid('current_image').sample(HISTOGRAM_SAMPLES)
+        if sample.size < image.size:
+            draw(sample, 'Image Histogram (estimate)')
+        else:
+            draw(image, 'Image Histogram')
         
-        canvas = FigureCanvasTkAgg(fig, hist_window)
+        ttk.Button(hist_window, text="Refine to Full Resolution",
+                  command=lambda: draw(image, 'Image Histogram')).pack(side=tk.BOTTOM, pady=5)
         canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
         
     def show_fft_spectrum(self):
@@ -355,19 +449,32 @@ class ImageEnhancementGUI:
         fft_window.title("FFT Magnitude Spectrum")
         fft_window.geometry("600x400")
         
-        # Compute FFT
-        f_transform = np.fft.fft2(self.current_image)
-        f_shift = np.fft.fftshift(f_transform)
-        magnitude_spectrum = np.log(np.abs(f_shift) + 1)
+        fig, canvas = create_figure_canvas(fft_window, figsize=(8, 6))
+        image = self.current_image
+        
+        def draw(data, title):
+            # Compute FFT
+            f_transform = np.fft.fft2(ops.to_grayscale(data))
+            f_shift = np.fft.fftshift(f_transform)
+            magnitude_spectrum = np.log(np.abs(f_shift) + 1)
+            
+            fig.clear()
+            ax = fig.add_subplot(111)
+            im = ax.imshow(magnitude_spectrum, cmap='gray')
+            ax.set_title(title)
+            ax.axis('off')
+            fig.colorbar(im, ax=ax)
+            canvas.draw()
         
-        fig = Figure(figsize=(8, 6))
-        ax = fig.add_subplot(111)
-        im = ax.imshow(magnitude_spectrum, cmap='gray')
-        ax.set_title('FFT Magnitude Spectrum (Log Scale)')
-        ax.axis('off')
-        fig.colorbar(im, ax=ax)
+        # The preview level only holds the lower frequencies of the full image
+        preview = self.pyramid('current_image').coarsest(SPECTRUM_PREVIEW_SIZE, SPECTRUM_PREVIEW_SIZE)
+        if preview is image:
+            draw(image, 'FFT Magnitude Spectrum (Log Scale)')
+        else:
+            draw(preview, 'FFT Magnitude Spectrum (Log Scale, preview)')
         
-        canvas = FigureCanvasTkAgg(fig, fft_window)
+        ttk.Button(fft_window, text="Refine to Full Resolution",
+                  command=lambda: draw(image, 'FFT Magnitude Spectrum (Log Scale)')).pack(side=tk.BOTTOM, pady=5)
         canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
         
     def update_display(self):
@@ -375,13 +482,21 @@ class ImageEnhancementGUI:
         self.fig.clear()
         
         if self.current_image is not None:
+            if self.full_resolution.get():
+                original, enhanced = self.original_image, self.current_image
+            else:
+                # Each image gets at most half the figure; finer levels would not be visible
+                width, height = self.fig.get_size_inches() * self.fig.dpi
+                original = self.pyramid('original_image').fit(int(height), int(width) // 2)
+                enhanced = self.pyramid('current_image').fit(int(height), int(width) // 2)
+            
             ax1 = self.fig.add_subplot(121)
-            ax1.imshow(self.original_image, cmap='gray')
+            ax1.imshow(ops.to_display(original), cmap='gray')
             ax1.set_title('Original Image')
             ax1.axis('off')
             
             ax2 = self.fig.add_subplot(122)
-            ax2.imshow(self.current_image, cmap='gray')
+            ax2.imshow(ops.to_display(enhanced), cmap='gray')
             ax2.set_title('Enhanced Image')
             ax2.axis('off')
         else:
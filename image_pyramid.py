@@ -0,0 +1,68 @@
+import cv2
+
+# Levels stop halving once the shorter side would drop below this
+MIN_LEVEL_SIZE = 32
+
+
+class ImagePyramid:
+    """Multi-resolution view of an image for display and analysis previews
+
+    Level 0 is the image itself and each further level is a cv2.pyrDown of the
+    previous one. Levels are built on first use, so a pyramid is cheap to create
+    and should simply be replaced when the image changes.
+    """
+
+    def __init__(self, image, min_size=MIN_LEVEL_SIZE):
+        self.image = image
+        self.min_size = min_size
+        self._levels = [image]
+
+    def _extend(self, n):
+        """Build levels up to n; False if the image is too small for level n"""
+        while len(self._levels) <= n:
+            previous = self._levels[-1]
+            if min(previous.shape[:2]) < 2 * self.min_size:
+                return False
+            self._levels.append(cv2.pyrDown(previous))
+        return True
+
+    def level(self, n):
+        """Level n, or the coarsest available level if the image is too small"""
+        self._extend(n)
+        return self._levels[min(n, len(self._levels) - 1)]
+
+    def coarsest(self, min_rows, min_cols):
+        """Coarsest level with at least min_rows x min_cols pixels"""
+        n = 0
+        while self._extend(n + 1):
+            rows, cols = self._levels[n + 1].shape[:2]
+            if rows < min_rows or cols < min_cols:
+                break
+            n += 1
+        return self._levels[n]
+
+    def fit(self, max_rows, max_cols):
+        """Image scaled to fit within max_rows x max_cols, never upscaled
+
+        Starts from the coarsest level that is still large enough and finishes
+        with an INTER_AREA resize to the exact size.
+        """
+        rows, cols = self.image.shape[:2]
+        scale = min(1.0, max_rows / rows, max_cols / cols)
+        target = (max(round(rows * scale), 1), max(round(cols * scale), 1))
+        level = self.coarsest(*target)
+        if level.shape[:2] == target:
+            return level
+        return cv2.resize(level, (target[1], target[0]), interpolation=cv2.INTER_AREA)
+
+    def sample(self, min_pixels):
+        """Strided view with at least min_pixels pixels, for histogram estimates
+
+        Smoothed levels average neighbouring pixels and narrow the histogram, so
+        estimates take every 2**n-th pixel of the full image on the same grid.
+        """
+        rows, cols = self.image.shape[:2]
+        step = 1
+        while -(-rows // (2 * step)) * -(-cols // (2 * step)) >= min_pixels:
+            step *= 2
+        return self.image[::step, ::step]
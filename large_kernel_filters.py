@@ -0,0 +1,125 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+
+# Kernel sizes from which smoothing switches to the constant-time backends.
+# None disables the switch. Current OpenCV builds run blur/medianBlur in
+# constant time for 8-bit images and beat both backends at every candidate
+# size, so the defaults keep cv2. Builds whose filters grow with the aperture
+# can time both backends once with calibrate(), or set a threshold directly.
+KERNEL_THRESHOLDS = {'mean': None, 'median': None}
+CANDIDATE_THRESHOLDS = (15, 31, 51, 101)
+
+# Serializes calibration so concurrent runs do not time each other's load
+_calibration_lock = threading.Lock()
+
+# Each backend's calibration time is the best of this many runs
+CALIBRATION_REPEATS = 5
+
+
+def box_filter_integral(image, kernel_size):
+    """Mean filter from an integral image: four lookups per pixel for any kernel size"""
+    radius = kernel_size // 2
+    rows, cols = image.shape[:2]
+    # Same border handling as cv2.blur
+    padded = cv2.copyMakeBorder(image, radius, radius, radius, radius, cv2.BORDER_REFLECT_101)
+    sums = cv2.integral(padded, sdepth=cv2.CV_64F)
+    if sums.ndim == 2 and image.ndim == 3:
+        sums = sums[..., np.newaxis]
+
+    k = kernel_size
+    window = (sums[k:k + rows, k:k + cols] - sums[:rows, k:k + cols]
+              - sums[k:k + rows, :cols] + sums[:rows, :cols])
+    if np.issubdtype(image.dtype, np.integer):
+        # cv2.blur's vectorized path scales integer sums in float32 before rounding
+        mean = window.astype(np.float32) * np.float32(1.0 / (k * k))
+        np.rint(mean, out=mean)
+    else:
+        mean = window / (k * k)
+    return mean.astype(image.dtype)
+
+
+def median_filter_histogram(image, kernel_size):
+    """Median filter for 8-bit images whose cost does not grow with kernel size
+
+    Threshold decomposition of the local histogram: the median is the number of
+    grey levels t whose running-sum window count of (pixel <= t) is still below
+    half the window. Each level costs a few O(1)-per-pixel passes, so the total
+    depends on the number of grey levels present, not on the kernel size.
+    """
+    if image.dtype != np.uint8:
+        raise ValueError("Histogram median filter supports 8-bit images only")
+
+    half = kernel_size * kernel_size // 2 + 1
+    low, high = int(image.min()), int(image.max())
+    below = np.zeros(image.shape, np.uint16)
+    for level in range(low, high):
+        # 1 where pixel <= level
+        _, at_or_below = cv2.threshold(image, level, 1, cv2.THRESH_BINARY_INV)
+        counts = cv2.boxFilter(at_or_below, cv2.CV_16U, (kernel_size, kernel_size),
+                               normalize=False, borderType=cv2.BORDER_REPLICATE)
+        # 255 where fewer than half the window is <= level: the median is above it
+        cv2.add(below, cv2.compare(counts, half, cv2.CMP_LT), dst=below, dtype=cv2.CV_16U)
+    return (below // 255 + low).astype(np.uint8)
+
+
+BACKENDS = {
+    'mean': (lambda img, k: cv2.blur(img, (k, k)), box_filter_integral),
+    'median': (cv2.medianBlur, median_filter_histogram),
+}
+
+
+def _calibrate(filter_type, probe_size=256):
+    """Smallest candidate kernel size where the constant-time backend beats cv2"""
+    probe = np.random.default_rng(0).integers(0, 256, (probe_size, probe_size), dtype=np.uint8)
+    cv2_backend, constant_backend = BACKENDS[filter_type]
+    for kernel_size in CANDIDATE_THRESHOLDS:
+        timings = []
+        for backend in (cv2_backend, constant_backend):
+            best = float('inf')
+            for _ in range(CALIBRATION_REPEATS):
+                start = time.perf_counter()
+                backend(probe, kernel_size)
+                best = min(best, time.perf_counter() - start)
+            timings.append(best)
+        if timings[1] < timings[0]:
+            return kernel_size
+    return None
+
+
+def calibrate(filter_types=None):
+    """Time both backends and store the resulting thresholds in KERNEL_THRESHOLDS
+
+    Takes around a second, so run it once at startup rather than in
+    short-lived workers.
+    """
+    with _calibration_lock:
+        for filter_type in filter_types or tuple(BACKENDS):
+            KERNEL_THRESHOLDS[filter_type] = _calibrate(filter_type)
+        return dict(KERNEL_THRESHOLDS)
+
+
+def kernel_threshold(filter_type):
+    """Kernel size threshold for a filter type; None always uses cv2"""
+    return KERNEL_THRESHOLDS.get(filter_type)
+
+
+def uses_constant_time(filter_type, kernel_size, dtype=np.uint8):
+    """Whether smoothing should use the constant-time backend for this kernel size"""
+    if filter_type not in BACKENDS:
+        return False
+    if filter_type == 'median' and dtype != np.uint8:
+        return False
+    if kernel_size < min(CANDIDATE_THRESHOLDS):
+        return False
+    threshold = kernel_threshold(filter_type)
+    return threshold is not None and kernel_size >= threshold
+
+
+def constant_time_smooth(image, filter_type, kernel_size):
+    """Run the constant-time backend for 'mean' or 'median'"""
+    if filter_type not in BACKENDS:
+        raise ValueError(f"No constant-time backend for filter: {filter_type}")
+    return BACKENDS[filter_type][1](image, kernel_size)
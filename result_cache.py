@@ -0,0 +1,174 @@
+import hashlib
+import io
+import json
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+# Processing modules whose source is part of every cache key, so editing any of
+# them invalidates results computed by the old code
+PROCESSING_MODULES = ('image_enhancement.py', 'enhancement_ops.py', 'large_kernel_filters.py',
+                      'sharpening.py', 'clahe.py')
+
+DEFAULT_MAX_BYTES = 1 << 30  # 1 GiB
+
+# 8/16-bit results are stored as fast-compressed PNG, anything else as raw .npy
+ENTRY_EXTENSIONS = ('.png', '.npy')
+
+# put() rescans the cache directory only when its running size estimate goes
+# past max_bytes, or after this many writes to pick up other workers' entries
+RESCAN_WRITES = 256
+
+# Eviction frees space down to this fraction of max_bytes, so a full cache
+# is not rescanned on every write
+EVICT_TO = 0.9
+
+# Temporary files older than this were left behind by a worker killed mid-write
+STALE_TMP_SECONDS = 3600
+
+
+def code_version():
+    """Digest of the processing modules' source"""
+    digest = hashlib.blake2b(digest_size=16)
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    for name in PROCESSING_MODULES:
+        with open(os.path.join(base_dir, name), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def image_digest(image):
+    """Content hash of an image's pixels, shape and dtype"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f'{image.shape}{image.dtype.str}'.encode())
+    digest.update(np.ascontiguousarray(image).data)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Content-addressed on-disk cache of result arrays with size-bounded LRU eviction
+
+    Entries are lossless PNG (8/16-bit) or .npy files written to a temporary file
+    and moved into place with os.replace, so concurrent workers never see
+    partial entries. Reads refresh an entry's mtime, and eviction removes the least recently used
+    entries once the cache grows past max_bytes. Writes only rescan the directory
+    when a running size estimate says the budget may be exceeded.
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = os.path.expanduser(cache_dir)
+        self.max_bytes = max_bytes
+        self.version = code_version()
+        self._estimated_bytes = None  # unknown until the first scan
+        self._writes_since_scan = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key(self, image_hash, operation, params):
+        """Cache key for an operation with its parameters on an image"""
+        spec = json.dumps({'image': image_hash, 'operation': operation, 'params': params,
+                           'version': self.version}, sort_keys=True, default=str)
+        return hashlib.blake2b(spec.encode(), digest_size=20).hexdigest()
+
+    def _path(self, key, ext):
+        return os.path.join(self.cache_dir, key[:2], key + ext)
+
+    def get(self, key):
+        """Cached result array for key, or None"""
+        for ext in ENTRY_EXTENSIONS:
+            path = self._path(key, ext)
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                os.utime(path)
+            except OSError:
+                # Missing, or evicted by another worker meanwhile
+                continue
+            if ext == '.png':
+                return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_UNCHANGED)
+            return np.load(io.BytesIO(data))
+        return None
+
+    def put(self, key, result):
+        """Store a result array and evict old entries if over budget"""
+        if result.dtype in (np.uint8, np.uint16) and (result.ndim == 2 or result.shape[2] in (3, 4)):
+            data = cv2.imencode('.png', result, [cv2.IMWRITE_PNG_COMPRESSION, 1])[1].tobytes()
+            path = self._path(key, '.png')
+        else:
+            buffer = io.BytesIO()
+            np.save(buffer, result)
+            data = buffer.getvalue()
+            path = self._path(key, '.npy')
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self._writes_since_scan += 1
+        if self._estimated_bytes is not None:
+            self._estimated_bytes += len(data)
+        if (self._estimated_bytes is None or self._estimated_bytes > self.max_bytes
+                or self._writes_since_scan >= RESCAN_WRITES):
+            self.evict()
+
+    def get_or_compute(self, key, compute):
+        """Cached result for key, computing and storing it on a miss"""
+        result = self.get(key)
+        if result is None:
+            result = compute()
+            self.put(key, result)
+        return result
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes
+
+        Once over budget, entries are removed down to EVICT_TO of it. Also removes stale temporary files left by interrupted writes.
+        """
+        entries = []
+        now = time.time()
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                is_tmp = entry.name.endswith('.tmp')
+                if not (is_tmp or entry.name.endswith(ENTRY_EXTENSIONS)):
+                    continue
+                try:
+                    stat = entry.stat()
+                    if is_tmp:
+                        # Recent ones may still be being written by another worker
+                        if now - stat.st_mtime > STALE_TMP_SECONDS:
+                            os.remove(entry.path)
+                        continue
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * EVICT_TO if total > self.max_bytes else self.max_bytes
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # Another worker evicted it first
+                pass
+            total -= size
+        self._estimated_bytes = total
+        self._writes_since_scan = 0
+
+    def clear(self):
+        """Remove every entry"""
+        max_bytes, self.max_bytes = self.max_bytes, -1
+        self.evict()
+        self.max_bytes = max_bytes
@@ -0,0 +1,192 @@
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from image_enhancement import apply_operation
+
+# Blocks are allocated in multiples of this size so similar frames share blocks
+BLOCK_GRANULARITY = 1 << 20  # 1 MiB
+
+# Attachments a worker keeps open; older ones are closed so blocks the parent
+# has unlinked do not stay mapped
+MAX_ATTACHED = 16
+
+# Names of recently unlinked blocks sent along with every task
+RETIRED_NAMES = 64
+
+# Worker-side cache of attached blocks by name, least recently used first
+_attached = OrderedDict()
+
+
+def _attach(name):
+    """Attach to a parent-owned block, reusing the mapping across tasks"""
+    block = _attached.pop(name, None)
+    if block is None:
+        try:
+            block = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Python < 3.13 registers the attachment too, but pool workers share
+            # the parent's resource tracker, so that is a no-op there
+            block = shared_memory.SharedMemory(name=name)
+    _attached[name] = block
+    while len(_attached) > MAX_ATTACHED:
+        _attached.popitem(last=False)[1].close()
+    return block
+
+
+def _detach(names):
+    """Close this worker's mappings of blocks the parent has unlinked"""
+    for name in names:
+        block = _attached.pop(name, None)
+        if block is not None:
+            block.close()
+
+
+def _view(descriptor):
+    """ndarray over a shared block from a (name, shape, dtype) descriptor"""
+    name, shape, dtype = descriptor
+    return np.ndarray(shape, np.dtype(dtype), buffer=_attach(name).buf)
+
+
+def _run_shared(input_descriptor, output_descriptor, operation, params, color_mode,
+                retired=()):
+    """Worker: read the input block, write the result into the output block"""
+    _detach(retired)
+    source = _view(input_descriptor)
+    target = _view(output_descriptor)
+    if operation is None:
+        # Transport only, used to measure the overhead
+        target[...] = source
+    else:
+        target[...] = apply_operation(source, operation, params, color_mode)
+
+
+class SharedBlockPool:
+    """Recycles shared memory blocks by size instead of allocating one per frame"""
+
+    def __init__(self, max_free_blocks=8):
+        self.max_free_blocks = max_free_blocks
+        self.retired = deque(maxlen=RETIRED_NAMES)
+        self._free = []
+        self._lock = threading.Lock()
+
+    def acquire(self, nbytes):
+        """A block of at least nbytes, reused when one is free"""
+        size = max(-(-nbytes // BLOCK_GRANULARITY), 1) * BLOCK_GRANULARITY
+        with self._lock:
+            for i, block in enumerate(self._free):
+                if block.size == size:
+                    return self._free.pop(i)
+        return shared_memory.SharedMemory(create=True, size=size)
+
+    def release(self, block):
+        """Return a block for reuse, freeing the oldest beyond max_free_blocks"""
+        with self._lock:
+            self._free.append(block)
+            surplus = self._free[:-self.max_free_blocks] if self.max_free_blocks else self._free[:]
+            del self._free[:len(surplus)]
+        for old in surplus:
+            self.retired.append(old.name)
+            old.close()
+            old.unlink()
+
+    def close(self):
+        """Free every pooled block"""
+        with self._lock:
+            blocks, self._free = self._free, []
+        for block in blocks:
+            self.retired.append(block.name)
+            block.close()
+            block.unlink()
+
+
+class SharedFrame:
+    """An image array living in a pooled shared memory block
+
+    Call release() (or use it as a context manager) when done so the block goes
+    back to the pool; do not keep views of .array after that.
+    """
+
+    def __init__(self, pool, shape, dtype):
+        dtype = np.dtype(dtype)
+        self._pool = pool
+        self.block = pool.acquire(int(np.prod(shape)) * dtype.itemsize)
+        self.array = np.ndarray(shape, dtype, buffer=self.block.buf)
+
+    @property
+    def descriptor(self):
+        """(name, shape, dtype) passed to workers instead of the pixels"""
+        return self.block.name, self.array.shape, self.array.dtype.str
+
+    def release(self):
+        if self.block is not None:
+            self.array = None
+            self._pool.release(self.block)
+            self.block = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class SharedMemoryWorkerPool:
+    """Process pool that moves frames through shared memory instead of pickling them
+
+    Only (name, shape, dtype) descriptors cross the process boundary. Producers
+    can decode straight into frame() buffers; submit() returns a future for a
+    SharedFrame holding the result.
+    """
+
+    def __init__(self, processes=None, max_free_blocks=8):
+        self.blocks = SharedBlockPool(max_free_blocks)
+        self._executor = ProcessPoolExecutor(processes)
+
+    def frame(self, shape, dtype=np.uint8):
+        """An uninitialised shared frame to fill in place"""
+        return SharedFrame(self.blocks, shape, dtype)
+
+    def share(self, image):
+        """Copy an existing array into a shared frame"""
+        frame = self.frame(image.shape, image.dtype)
+        frame.array[...] = image
+        return frame
+
+    def submit(self, frame, operation, params=None, color_mode='grayscale'):
+        """Future resolving to a SharedFrame with the result of a named operation"""
+        output = self.frame(frame.array.shape, frame.array.dtype)
+        # Workers drop their mappings of unlinked blocks when they see the names
+        done = self._executor.submit(_run_shared, frame.descriptor, output.descriptor,
+                                     operation, params, color_mode, tuple(self.blocks.retired))
+        result = Future()
+
+        def finish(task):
+            error = task.exception()
+            if error is None:
+                result.set_result(output)
+            else:
+                output.release()
+                result.set_exception(error)
+
+        done.add_done_callback(finish)
+        return result
+
+    def process(self, image, operation, params=None, color_mode='grayscale'):
+        """Convenience round trip: copy in, process, copy the result out"""
+        with self.share(image) as frame:
+            with self.submit(frame, operation, params, color_mode).result() as output:
+                return output.array.copy()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.blocks.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
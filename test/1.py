@@ -2,19 +2,36 @@ import cv2
 import numpy as np
 import matplotlib.pyplot as plt
 
-def contrast_stretching(image_path):
+def percentile_range(img, low=1, high=99, step=1):
     """
-    Perform contrast stretching on an image
+    Intensities at the low and high percentiles, from the histogram of every
+    step-th pixel in both directions (step=1 uses all pixels)
+    """
+    sample = np.ascontiguousarray(img[::step, ::step])
+    cdf = cv2.calcHist([sample], [0], None, [256], [0, 256]).ravel().cumsum()
+    r_min = np.searchsorted(cdf, max(low / 100.0 * cdf[-1], 1))
+    r_max = np.searchsorted(cdf, max(high / 100.0 * cdf[-1], 1))
+    return r_min, r_max
+
+def contrast_stretching(image_path, low=1, high=99, step=1):
+    """
+    Perform contrast stretching on an image between the low and high
+    percentiles, so a few hot or dead pixels do not set the range
     """
     # Read the image
     img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
     
-    # Get min and max pixel values
-    r_min = np.min(img)
-    r_max = np.max(img)
+    # Get the percentile pixel values
+    r_min, r_max = percentile_range(img, low, high, step)
     
-    # Apply contrast stretching formula: s = (r - r_min) * (255 / (r_max - r_min))
-    stretched = ((img - r_min) * (255.0 / (r_max - r_min))).astype(np.uint8)
+    # Apply contrast stretching formula: s = (r - r_min) * (255 / (r_max - r_min)),
+    # as a lookup table; a uniform image is left unchanged
+    levels = np.arange(256, dtype=np.float32)
+    if r_max > r_min:
+        lut = np.clip(np.rint((levels - r_min) * (255.0 / (r_max - r_min))), 0, 255)
+    else:
+        lut = levels
+    stretched = cv2.LUT(img, lut.astype(np.uint8))
     
     # Display results
     plt.figure(figsize=(12, 4))
@@ -1,101 +1,44 @@
+import os
+import sys
+
 import cv2
 import numpy as np
 import matplotlib.pyplot as plt
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import enhancement_ops as ops
+import filter_bank
+
 def frequency_domain_filtering(image_path):
     """
     Perform frequency domain filtering using Fourier Transform
     """
     # Read the image
     img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
-    rows, cols = img.shape
     
-    # Apply Fourier Transform
+    # Apply Fourier Transform (for the spectrum display)
     f_transform = np.fft.fft2(img)
     f_shift = np.fft.fftshift(f_transform)
     
-    # Create coordinate arrays
-    crow, ccol = rows // 2, cols // 2
-    
-    # LOW-PASS FILTERS
-    
-    # 1. Ideal Low-Pass Filter
-    def ideal_lowpass_filter(shape, cutoff):
-        rows, cols = shape
-        crow, ccol = rows // 2, cols // 2
-        mask = np.zeros((rows, cols), np.uint8)
-        y, x = np.ogrid[:rows, :cols]
-        mask_area = (x - ccol) ** 2 + (y - crow) ** 2 <= cutoff ** 2
-        mask[mask_area] = 1
-        return mask
-    
-    # 2. Butterworth Low-Pass Filter
-    def butterworth_lowpass_filter(shape, cutoff, order):
-        rows, cols = shape
-        crow, ccol = rows // 2, cols // 2
-        y, x = np.ogrid[:rows, :cols]
-        d = np.sqrt((x - ccol) ** 2 + (y - crow) ** 2)
-        mask = 1 / (1 + (d / cutoff) ** (2 * order))
-        return mask
-    
-    # 3. Gaussian Low-Pass Filter
-    def gaussian_lowpass_filter(shape, cutoff):
-        rows, cols = shape
-        crow, ccol = rows // 2, cols // 2
-        y, x = np.ogrid[:rows, :cols]
-        d = np.sqrt((x - ccol) ** 2 + (y - crow) ** 2)
-        mask = np.exp(-(d ** 2) / (2 * (cutoff ** 2)))
-        return mask
-    
-    # HIGH-PASS FILTERS (complement of low-pass)
-    
-    def ideal_highpass_filter(shape, cutoff):
-        return 1 - ideal_lowpass_filter(shape, cutoff)
-    
-    def butterworth_highpass_filter(shape, cutoff, order):
-        return 1 - butterworth_lowpass_filter(shape, cutoff, order)
-    
-    def gaussian_highpass_filter(shape, cutoff):
-        return 1 - gaussian_lowpass_filter(shape, cutoff)
-    
-    # Apply filters
+    # Ideal, Butterworth and Gaussian low-pass and high-pass filters in one sweep:
+    # one forward FFT and all masks from one distance grid
     cutoff = 50
     order = 2
+    results = filter_bank.sweep(img, cutoffs=(cutoff,), orders=(order,))
+    filtered = {(r['filter_type'], r['filter_name']): r['image'] for r in results}
     
-    # Low-pass filtering
-    ideal_lp = ideal_lowpass_filter(img.shape, cutoff)
-    butterworth_lp = butterworth_lowpass_filter(img.shape, cutoff, order)
-    gaussian_lp = gaussian_lowpass_filter(img.shape, cutoff)
-    
-    # High-pass filtering
-    ideal_hp = ideal_highpass_filter(img.shape, cutoff)
-    butterworth_hp = butterworth_highpass_filter(img.shape, cutoff, order)
-    gaussian_hp = gaussian_highpass_filter(img.shape, cutoff)
-    
-    # Apply filters to frequency domain
-    filtered_ideal_lp = f_shift * ideal_lp
-    filtered_butterworth_lp = f_shift * butterworth_lp
-    filtered_gaussian_lp = f_shift * gaussian_lp
-    
-    filtered_ideal_hp = f_shift * ideal_hp
-    filtered_butterworth_hp = f_shift * butterworth_hp
-    filtered_gaussian_hp = f_shift * gaussian_hp
-    
-    # Convert back to spatial domain
-    def ifft_and_real(f_filtered):
-        f_ishift = np.fft.ifftshift(f_filtered)
-        img_back = np.fft.ifft2(f_ishift)
-        return np.real(img_back).astype(np.uint8)
+    def mask(filter_type, filter_name):
+        return ops.frequency_mask(img.shape, filter_type, filter_name, cutoff, order)
     
     # Low-pass results
-    result_ideal_lp = ifft_and_real(filtered_ideal_lp)
-    result_butterworth_lp = ifft_and_real(filtered_butterworth_lp)
-    result_gaussian_lp = ifft_and_real(filtered_gaussian_lp)
+    ideal_lp, result_ideal_lp = mask('lowpass', 'ideal'), filtered['lowpass', 'ideal']
+    butterworth_lp, result_butterworth_lp = mask('lowpass', 'butterworth'), filtered['lowpass', 'butterworth']
+    gaussian_lp, result_gaussian_lp = mask('lowpass', 'gaussian'), filtered['lowpass', 'gaussian']
     
     # High-pass results
-    result_ideal_hp = ifft_and_real(filtered_ideal_hp)
-    result_butterworth_hp = ifft_and_real(filtered_butterworth_hp)
-    result_gaussian_hp = ifft_and_real(filtered_gaussian_hp)
+    ideal_hp, result_ideal_hp = mask('highpass', 'ideal'), filtered['highpass', 'ideal']
+    butterworth_hp, result_butterworth_hp = mask('highpass', 'butterworth'), filtered['highpass', 'butterworth']
+    gaussian_hp, result_gaussian_hp = mask('highpass', 'gaussian'), filtered['highpass', 'gaussian']
     
     # Display results
     plt.figure(figsize=(20, 15))
@@ -159,9 +102,22 @@ def frequency_domain_filtering(image_path):
         }
     }
 
+def cutoff_sweep(image_path, cutoffs=range(10, 160, 10)):
+    """
+    Compare many cutoffs by summary metrics only, without keeping the images
+    """
+    img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+    results = filter_bank.sweep(img, filter_types=('lowpass',), cutoffs=cutoffs,
+                                metrics=('energy_retained', 'psnr'))
+    for r in results:
+        print(f"{r['filter_name']:<12} cutoff {r['cutoff']:>4}: "
+              f"energy {r['energy_retained']:.4f}, PSNR {r['psnr']:.2f} dB")
+    return results
+
 # Usage
 if __name__ == "__main__":
     filtered_images = frequency_domain_filtering('profile.jpg')
+    cutoff_sweep('profile.jpg')
     
     # Save filtered images
     for filter_type, images in filtered_images.items():
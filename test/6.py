@@ -0,0 +1,93 @@
+import asyncio
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from enhancement_service import EnhancementService, LocalClient, QueueFullError
+
+
+def encoded_image(seed=0):
+    """Small PNG so the checks do not depend on an image file"""
+    image = np.random.default_rng(seed).integers(0, 256, (64, 64), dtype=np.uint8)
+    return cv2.imencode('.png', image)[1].tobytes()
+
+
+async def check_coalescing():
+    """Identical in-flight requests share one computation"""
+    async with EnhancementService(max_workers=2) as service:
+        client = LocalClient(service)
+        image_bytes = encoded_image()
+        requests = [client.enhance(image_bytes, 'spatial_smoothing', kernel_size=5)
+                    for _ in range(8)]
+        requests.append(client.enhance(image_bytes, 'spatial_smoothing', kernel_size=7))
+        results = await asyncio.gather(*requests)
+
+        assert len(set(results[:8])) == 1
+        assert service.stats['requests'] == 9
+        assert service.stats['computed'] == 2
+        assert service.stats['coalesced'] == 7
+        assert service.pending == 0
+        return service.latency_percentiles()
+
+
+async def check_admission_timeout():
+    """admission_timeout=0 rejects a request as soon as every slot is taken"""
+    blocker = threading.Event()
+    executor = ThreadPoolExecutor(1)
+    # Occupy the only worker so the admitted request stays pending
+    executor.submit(blocker.wait)
+    service = EnhancementService(executor, max_pending=1, admission_timeout=0)
+    client = LocalClient(service)
+
+    admitted = asyncio.ensure_future(client.enhance(encoded_image(0), 'histogram_equalization'))
+    await asyncio.sleep(0.01)
+    assert service.pending == 1
+    try:
+        await client.enhance(encoded_image(1), 'histogram_equalization')
+    except QueueFullError:
+        pass
+    else:
+        raise AssertionError("expected QueueFullError")
+    assert service.stats['rejected'] == 1
+
+    blocker.set()
+    await admitted
+    assert service.stats['computed'] == 1 and service.pending == 0
+    executor.shutdown(wait=True)
+
+
+async def check_float_output():
+    """A float result encoded as PNG keeps its levels instead of collapsing to 0 / 1"""
+    image = np.random.default_rng(2).random((64, 64), dtype=np.float32) * 4000
+    tiff_bytes = cv2.imencode('.tiff', image)[1].tobytes()
+    async with EnhancementService(max_workers=1) as service:
+        png_bytes = await LocalClient(service).enhance(tiff_bytes, 'histogram_equalization',
+                                                       high_bit_depth=True)
+        assert service.stats['failed'] == 0
+    result = cv2.imdecode(np.frombuffer(png_bytes, np.uint8), cv2.IMREAD_UNCHANGED)
+    assert result.dtype == np.uint16
+    assert len(np.unique(result)) > 256 and result.max() == 65535
+
+
+def check_percentiles(percentiles):
+    assert set(percentiles) == {50, 90, 99}
+    assert 0 < percentiles[50] <= percentiles[90] <= percentiles[99]
+    assert EnhancementService().latency_percentiles() == {50: None, 90: None, 99: None}
+
+
+async def main():
+    percentiles = await check_coalescing()
+    await check_admission_timeout()
+    await check_float_output()
+    check_percentiles(percentiles)
+    print("coalescing, admission timeout, float output and latency percentiles OK:", percentiles)
+
+
+# Usage
+if __name__ == "__main__":
+    asyncio.run(main())
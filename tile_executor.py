@@ -0,0 +1,436 @@
+import os
+import struct
+import threading
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+import enhancement_ops as ops
+
+# Rows per strip processed by one worker
+DEFAULT_STRIP_ROWS = 256
+
+# TIFF tag ids used by the strip reader and writer
+TIFF_WIDTH = 256
+TIFF_HEIGHT = 257
+TIFF_BITS_PER_SAMPLE = 258
+TIFF_COMPRESSION = 259
+TIFF_PHOTOMETRIC = 262
+TIFF_STRIP_OFFSETS = 273
+TIFF_SAMPLES_PER_PIXEL = 277
+TIFF_ROWS_PER_STRIP = 278
+TIFF_STRIP_BYTE_COUNTS = 279
+TIFF_PLANAR_CONFIG = 284
+TIFF_TILE_WIDTH = 322
+TIFF_SAMPLE_FORMAT = 339
+
+TIFF_TYPE_SIZES = {1: 1, 3: 2, 4: 4}
+TIFF_TYPE_FORMATS = {1: 'B', 3: 'H', 4: 'I'}
+
+
+class ArrayStripReader:
+    """Strip access to an image decoded in full by cv2 (fallback for compressed files)"""
+
+    def __init__(self, image_path):
+        image = cv2.imread(image_path, cv2.IMREAD_UNCHANGED)
+        if image is None:
+            raise ValueError(f"Failed to load image: {image_path}")
+        if image.ndim == 3 and image.shape[2] == 4:
+            image = cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)
+        self.image = image
+        self.height, self.width = image.shape[:2]
+        self.channels = 1 if image.ndim == 2 else image.shape[2]
+        self.dtype = image.dtype
+
+    def read_rows(self, top, bottom):
+        """Rows [top, bottom) as a BGR or grayscale array"""
+        return self.image[top:bottom]
+
+    def close(self):
+        self.image = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class TiffStripReader:
+    """Reads rows of an uncompressed, strip-organised TIFF straight from disk"""
+
+    def __init__(self, image_path):
+        self.file = open(image_path, 'rb')
+        self.lock = threading.Lock()
+        try:
+            self._parse_header()
+        except Exception:
+            self.file.close()
+            raise
+
+    def _parse_header(self):
+        byte_order = self.file.read(2)
+        if byte_order not in (b'II', b'MM'):
+            raise ValueError("Not a TIFF file")
+        self.endian = '<' if byte_order == b'II' else '>'
+        magic, ifd_offset = struct.unpack(self.endian + 'HI', self.file.read(6))
+        if magic != 42:
+            raise ValueError("Only classic (non-BigTIFF) files are streamed")
+
+        tags = self._read_ifd(ifd_offset)
+        if tags.get(TIFF_COMPRESSION, [1])[0] != 1 or TIFF_TILE_WIDTH in tags:
+            raise ValueError("Only uncompressed strip TIFFs are streamed")
+        if tags.get(TIFF_PLANAR_CONFIG, [1])[0] != 1:
+            raise ValueError("Only interleaved (chunky) TIFFs are streamed")
+
+        self.width = tags[TIFF_WIDTH][0]
+        self.height = tags[TIFF_HEIGHT][0]
+        self.channels = tags.get(TIFF_SAMPLES_PER_PIXEL, [1])[0]
+        photometric = tags.get(TIFF_PHOTOMETRIC, [None])[0]
+        # Palette, min-is-white, CMYK, YCbCr etc. need conversion; leave them to cv2
+        if (photometric, self.channels) not in ((1, 1), (2, 3)):
+            raise ValueError("Only grayscale and RGB TIFFs are streamed")
+        bits = tags.get(TIFF_BITS_PER_SAMPLE, [1])[0]
+        sample_format = tags.get(TIFF_SAMPLE_FORMAT, [1])[0]
+        if (bits, sample_format) == (32, 3):
+            kind = 'f4'
+        elif bits in (8, 16) and sample_format == 1:
+            kind = f'u{bits // 8}'
+        else:
+            raise ValueError(f"Unsupported TIFF sample layout: {bits}-bit format {sample_format}")
+        self.file_dtype = np.dtype(self.endian + kind)
+        self.dtype = self.file_dtype.newbyteorder('=')
+
+        self.rows_per_strip = min(tags.get(TIFF_ROWS_PER_STRIP, [self.height])[0], self.height)
+        self.strip_offsets = tags[TIFF_STRIP_OFFSETS]
+        self.row_bytes = self.width * self.channels * self.file_dtype.itemsize
+
+    def _read_ifd(self, offset):
+        """Tag id -> list of values for the first image directory"""
+        self.file.seek(offset)
+        (count,) = struct.unpack(self.endian + 'H', self.file.read(2))
+        entries = [struct.unpack(self.endian + 'HHI4s', self.file.read(12)) for _ in range(count)]
+
+        tags = {}
+        for tag, value_type, value_count, raw in entries:
+            if value_type not in TIFF_TYPE_SIZES:
+                continue
+            size = TIFF_TYPE_SIZES[value_type] * value_count
+            if size > 4:
+                (value_offset,) = struct.unpack(self.endian + 'I', raw)
+                self.file.seek(value_offset)
+                raw = self.file.read(size)
+            fmt = f'{self.endian}{value_count}{TIFF_TYPE_FORMATS[value_type]}'
+            tags[tag] = list(struct.unpack(fmt, raw[:size]))
+        return tags
+
+    def read_rows(self, top, bottom):
+        """Rows [top, bottom) as a BGR or grayscale array"""
+        first_strip = top // self.rows_per_strip
+        last_strip = (bottom - 1) // self.rows_per_strip
+        start = top - first_strip * self.rows_per_strip
+
+        chunks = []
+        with self.lock:
+            for strip in range(first_strip, last_strip + 1):
+                strip_rows = min(self.rows_per_strip, self.height - strip * self.rows_per_strip)
+                self.file.seek(self.strip_offsets[strip])
+                chunks.append(self.file.read(strip_rows * self.row_bytes))
+
+        rows = np.frombuffer(b''.join(chunks), dtype=self.file_dtype)
+        rows = rows.reshape(-1, self.width, self.channels)[start:start + bottom - top]
+        rows = rows.astype(self.dtype, copy=False)
+        if self.channels == 1:
+            return rows[..., 0]
+        # TIFF stores RGB, the rest of the toolkit works in cv2's BGR order
+        return np.ascontiguousarray(rows[..., ::-1])
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class TiffStripWriter:
+    """Writes an uncompressed strip TIFF one strip at a time"""
+
+    def __init__(self, output_path, width, height, channels, dtype, rows_per_strip):
+        if np.dtype(dtype) not in (np.uint8, np.uint16, np.float32):
+            raise ValueError(f"Unsupported TIFF output dtype: {dtype}")
+        self.file = open(output_path, 'wb')
+        self.width, self.height, self.channels = width, height, channels
+        self.dtype = np.dtype(dtype)
+        self.rows_per_strip = rows_per_strip
+        self.strip_offsets = []
+        self.strip_byte_counts = []
+        # Header; the directory offset is patched in close()
+        self.file.write(b'II' + struct.pack('<HI', 42, 0))
+
+    def write_rows(self, rows):
+        """Append the next strip of rows"""
+        if self.channels == 3:
+            rows = rows[..., ::-1]
+        data = np.ascontiguousarray(rows, dtype=self.dtype.newbyteorder('<')).tobytes()
+        self.strip_offsets.append(self.file.tell())
+        self.strip_byte_counts.append(len(data))
+        self.file.write(data)
+
+    def close(self):
+        """Write the image directory and finish the file"""
+        bits = self.dtype.itemsize * 8
+        sample_format = 3 if self.dtype == np.float32 else 1
+        entries = [
+            (TIFF_WIDTH, 4, [self.width]),
+            (TIFF_HEIGHT, 4, [self.height]),
+            (TIFF_BITS_PER_SAMPLE, 3, [bits] * self.channels),
+            (TIFF_COMPRESSION, 3, [1]),
+            (TIFF_PHOTOMETRIC, 3, [2 if self.channels == 3 else 1]),
+            (TIFF_STRIP_OFFSETS, 4, self.strip_offsets),
+            (TIFF_SAMPLES_PER_PIXEL, 3, [self.channels]),
+            (TIFF_ROWS_PER_STRIP, 4, [self.rows_per_strip]),
+            (TIFF_STRIP_BYTE_COUNTS, 4, self.strip_byte_counts),
+            (TIFF_PLANAR_CONFIG, 3, [1]),
+            (TIFF_SAMPLE_FORMAT, 3, [sample_format] * self.channels),
+        ]
+
+        if self.file.tell() % 2:
+            self.file.write(b'\0')
+        ifd_offset = self.file.tell()
+        # Values that do not fit in an entry go right after the directory
+        extra_offset = ifd_offset + 2 + 12 * len(entries) + 4
+        directory, extra = [struct.pack('<H', len(entries))], []
+        for tag, value_type, values in entries:
+            data = struct.pack(f'<{len(values)}{TIFF_TYPE_FORMATS[value_type]}', *values)
+            if len(data) <= 4:
+                field = data.ljust(4, b'\0')
+            else:
+                field = struct.pack('<I', extra_offset)
+                extra.append(data)
+                extra_offset += len(data)
+            directory.append(struct.pack('<HHI', tag, value_type, len(values)) + field)
+        directory.append(struct.pack('<I', 0))
+
+        self.file.write(b''.join(directory + extra))
+        self.file.seek(4)
+        self.file.write(struct.pack('<I', ifd_offset))
+        self.file.close()
+
+
+class PngStripWriter:
+    """Writes an 8/16-bit PNG incrementally, compressing each strip as it arrives"""
+
+    def __init__(self, output_path, width, height, channels, dtype):
+        if np.dtype(dtype) not in (np.uint8, np.uint16):
+            raise ValueError("PNG output supports 8-bit and 16-bit images only, use TIFF")
+        self.file = open(output_path, 'wb')
+        self.channels = channels
+        self.dtype = np.dtype(dtype).newbyteorder('>')
+        self.compressor = zlib.compressobj(6)
+        color_type = 2 if channels == 3 else 0
+        header = struct.pack('>IIBBBBB', width, height, self.dtype.itemsize * 8,
+                             color_type, 0, 0, 0)
+        self.file.write(b'\x89PNG\r\n\x1a\n')
+        self._write_chunk(b'IHDR', header)
+
+    def _write_chunk(self, kind, data):
+        self.file.write(struct.pack('>I', len(data)) + kind + data)
+        self.file.write(struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff))
+
+    def write_rows(self, rows):
+        """Append the next strip of rows"""
+        if self.channels == 3:
+            rows = rows[..., ::-1]
+        samples = np.ascontiguousarray(rows, dtype=self.dtype).reshape(rows.shape[0], -1)
+        # Every scanline starts with filter type 0 (None)
+        scanlines = np.zeros((rows.shape[0], 1 + samples.nbytes // rows.shape[0]), np.uint8)
+        scanlines[:, 1:] = samples.view(np.uint8)
+        compressed = self.compressor.compress(scanlines.tobytes())
+        if compressed:
+            self._write_chunk(b'IDAT', compressed)
+
+    def close(self):
+        self._write_chunk(b'IDAT', self.compressor.flush())
+        self._write_chunk(b'IEND', b'')
+        self.file.close()
+
+
+def open_reader(image_path):
+    """Stream uncompressed TIFFs from disk, decode anything else in full"""
+    if os.path.splitext(image_path)[1].lower() in ('.tif', '.tiff'):
+        try:
+            return TiffStripReader(image_path)
+        except (ValueError, KeyError, struct.error):
+            pass
+    return ArrayStripReader(image_path)
+
+
+def open_writer(output_path, width, height, channels, dtype, rows_per_strip):
+    """Strip writer for a .png or .tif/.tiff output path"""
+    ext = os.path.splitext(output_path)[1].lower()
+    if ext in ('.tif', '.tiff'):
+        return TiffStripWriter(output_path, width, height, channels, dtype, rows_per_strip)
+    if ext == '.png':
+        return PngStripWriter(output_path, width, height, channels, dtype)
+    raise ValueError(f"Streaming output supports .png and .tiff, not {ext}")
+
+
+def _read(reader, top, bottom, color_mode, bounds=None):
+    """Rows of the input converted for the color mode
+
+    bounds: whole-file (min, max) for scaling float samples into [0, 1] the
+    way read_image does (see _float_bounds)
+    """
+    rows = reader.read_rows(top, bottom)
+    if color_mode == 'grayscale' and ops.is_color(rows):
+        rows = cv2.cvtColor(rows, cv2.COLOR_BGR2GRAY)
+    if bounds is not None:
+        rows = ops.normalize_float(rows, bounds)
+    return rows
+
+
+def _strips(height, strip_rows):
+    return [(top, min(top + strip_rows, height)) for top in range(0, height, strip_rows)]
+
+
+def _in_order(reader, strip_task, strip_rows, max_workers):
+    """strip_task(top, bottom) results in strip order, with a few strips in flight
+
+    Bounding the strips in flight keeps peak memory at a few strips.
+    """
+    workers = max_workers or min(4, os.cpu_count() or 1)
+    pending = deque()
+    with ThreadPoolExecutor(workers) as pool:
+        for top, bottom in _strips(reader.height, strip_rows):
+            pending.append(pool.submit(strip_task, top, bottom))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _run(reader, output_path, strip_task, color_mode, strip_rows, max_workers):
+    """Run strip_task(reader, top, bottom) over all strips and write them in order"""
+    channels = 1 if color_mode == 'grayscale' else reader.channels
+    writer = open_writer(output_path, reader.width, reader.height, channels,
+                         reader.dtype, strip_rows)
+    try:
+        for rows in _in_order(reader, lambda top, bottom: strip_task(reader, top, bottom),
+                              strip_rows, max_workers):
+            writer.write_rows(rows)
+    finally:
+        writer.close()
+
+
+def spatial_operation(method, kernel_size=5, amount=0.5, radius=4, threshold=0):
+    """(operation, halo rows) for a smoothing or sharpening method"""
+    if method in ('mean', 'gaussian', 'median'):
+        return (lambda img: ops.smooth(img, method, kernel_size)), kernel_size // 2
+    if method == 'unsharp':
+        return (lambda img: ops.sharpen(img, method, amount, radius, threshold)), radius
+    if method in ('laplacian', 'custom'):
+        return (lambda img: ops.sharpen(img, method)), 1
+    raise ValueError(f"Unknown spatial method: {method}")
+
+
+def process_file(input_path, output_path, operation, halo=0, color_mode='grayscale',
+                 strip_rows=DEFAULT_STRIP_ROWS, max_workers=None):
+    """Apply a spatial operation strip by strip, streaming from input to output file
+
+    Each strip is read with `halo` extra rows above and below, so operations
+    whose kernel radius is at most `halo` give the same result as on the full
+    image. Use spatial_operation() to get the operation and halo for a method.
+    """
+    with open_reader(input_path) as reader:
+        bounds = _float_bounds(reader, color_mode, strip_rows, max_workers)
+
+        def strip_task(reader, top, bottom):
+            halo_top = max(top - halo, 0)
+            halo_bottom = min(bottom + halo, reader.height)
+            rows = _read(reader, halo_top, halo_bottom, color_mode, bounds)
+            result = ops.apply_color_mode(rows, operation, color_mode)
+            return result[top - halo_top:bottom - halo_top]
+
+        _run(reader, output_path, strip_task, color_mode, strip_rows, max_workers)
+
+
+def _collect(reader, statistic, combine, color_mode, strip_rows, max_workers, bounds=None,
+             planes=True):
+    """First pass: statistic of every strip, folded into a running total with combine
+
+    statistic sees the planes the operation will process, or the rows as read
+    with planes=False. Totals are combined as strips finish, so memory does not
+    grow with the number of strips.
+    """
+    def strip_task(top, bottom):
+        rows = _read(reader, top, bottom, color_mode, bounds)
+        return statistic(ops.operation_input(rows, color_mode) if planes else rows)
+
+    total = None
+    for value in _in_order(reader, strip_task, strip_rows, max_workers):
+        total = value if total is None else combine(total, value)
+    return total
+
+
+def _add(total, value):
+    return np.add(total, value, out=total)
+
+
+def _extremes(img):
+    return img.min(axis=(0, 1)), img.max(axis=(0, 1))
+
+
+def _widen(total, value):
+    return np.minimum(total[0], value[0]), np.maximum(total[1], value[1])
+
+
+def _float_bounds(reader, color_mode, strip_rows, max_workers):
+    """Whole-file (min, max) for normalize_float, or None unless the file holds floats"""
+    if not np.issubdtype(reader.dtype, np.floating):
+        return None
+    low, high = _collect(reader, _extremes, _widen, color_mode, strip_rows, max_workers,
+                         planes=False)
+    return low.min(), high.max()
+
+
+def equalize_file(input_path, output_path, color_mode='grayscale',
+                  strip_rows=DEFAULT_STRIP_ROWS, max_workers=None):
+    """Two-pass histogram equalization: global histogram first, then the LUT per strip"""
+    with open_reader(input_path) as reader:
+        bounds = _float_bounds(reader, color_mode, strip_rows, max_workers)
+        hist = _collect(reader, ops.channel_histograms, _add, color_mode, strip_rows,
+                        max_workers, bounds)
+
+        def strip_task(reader, top, bottom):
+            rows = _read(reader, top, bottom, color_mode, bounds)
+            return ops.apply_color_mode(rows, lambda img: ops.equalize_histogram(img, hist),
+                                        color_mode)
+
+        _run(reader, output_path, strip_task, color_mode, strip_rows, max_workers)
+
+
+def contrast_stretch_file(input_path, output_path, color_mode='grayscale',
+                          strip_rows=DEFAULT_STRIP_ROWS, max_workers=None, low=0.0, high=100.0):
+    """Two-pass contrast stretching: global min/max (or percentiles) first, then the stretch per strip"""
+    with open_reader(input_path) as reader:
+        bounds = _float_bounds(reader, color_mode, strip_rows, max_workers)
+        if low == 0.0 and high == 100.0:
+            r_min, r_max = _collect(reader, _extremes, _widen, color_mode, strip_rows,
+                                    max_workers, bounds)
+        else:
+            hist = _collect(reader, ops.channel_histograms, _add, color_mode, strip_rows,
+                            max_workers, bounds)
+            r_min, r_max = ops.histogram_percentiles(hist, low, high, reader.dtype)
+
+        def strip_task(reader, top, bottom):
+            rows = _read(reader, top, bottom, color_mode, bounds)
+            return ops.apply_color_mode(rows, lambda img: ops.contrast_stretch(img, r_min, r_max),
+                                        color_mode)
+
+        _run(reader, output_path, strip_task, color_mode, strip_rows, max_workers)